@@ -0,0 +1,206 @@
+#!/usr/bin/python3
+
+"""
+Shared DIMACS CNF reader for the solvers and race.py
+
+The formula is read in bulk and kept in flat int32 arrays (array module, typecode 'i'):
+    lits: literals of all the clauses, without the 0 that ends each clause
+    offsets: the literals of clause i are lits[offsets[i]:offsets[i + 1]]
+Clauses may span several lines, comment lines may appear anywhere and a final "%" line ends the formula.
+A last clause without its 0 is closed at the end of the file. A token that is not an int32 raises ValueError.
+
+The occurrence index keeps the clauses where each literal appears:
+    occ_clauses[occ_offsets[k]:occ_offsets[k + 1]] are the clauses of literal l, with k = l % (2 * num_vars + 1)
+This is the layout of the lit_clause / position_list / all_vars lists of the solvers: positive literal l at
+position l and negative literal l at position 2 * num_vars + 1 + l, so occurrence_lists(cnf)[l] works for any l.
+
+NumPy is only used when the caller already imported it or the file is big enough to pay for its import.
+The arrays support the buffer protocol, numpy.frombuffer(cnf.lits, dtype=numpy.int32) wraps them without a copy.
+
+load() keeps a compiled copy of each file (.cnfb) in CACHE_FOLDER, named by the SHA-1 of the .cnf content:
+    header: "CNFB", version, num_vars, num_clauses, number of literals (native int32)
+    then lits, offsets, occ_offsets and occ_clauses as native int32 arrays
+The first load parses the text and writes the .cnfb, the next ones memory-map it: the arrays are then
+int32 memoryviews over the mapping, shared by every process that loads the same instance.
+"""
+
+import os
+import sys
+import mmap
+import struct
+import hashlib
+import collections
+from array import array
+
+NUMPY_MIN_BYTES = 1 << 20 # Smaller files are tokenised without NumPy unless it is already imported
+CACHE_FOLDER = os.environ.get("CNFB_CACHE", os.path.join(os.path.dirname(os.path.abspath(__file__)), ".cnfb")) # Compiled instances
+CNFB_MAGIC = b"CNFB"
+CNFB_VERSION = 2 # 2: malformed files raise instead of being truncated
+CNFB_HEADER = struct.Struct("=4siiii")
+
+# A CNF formula
+# num_vars: Number of variables (from the program line, or the highest variable if it is bigger)
+# num_clauses: Number of clauses read
+# lits, offsets: Flat literals and clause offsets
+# occ_offsets, occ_clauses: Occurrence index, only kept by the formulas loaded from a .cnfb (see occurrences)
+CNF = collections.namedtuple("CNF", ["num_vars", "num_clauses", "lits", "offsets", "occ_offsets", "occ_clauses"], defaults = [None, None])
+
+
+# Read a DIMACS CNF file
+def read(filename):
+    with open(filename, "rb") as f:
+        data = f.read()
+    num_vars = 0
+    start = 0
+    while start < len(data) and data[start] in b"cp\n": # Leading comments and program line
+        end = data.find(b"\n", start)
+        end = len(data) if end < 0 else end + 1
+        if data[start] == ord("p"):
+            num_vars = int(data[start:end].split()[2])
+        start = end
+    data = data[start:]
+    if b"c" in data or b"p" in data or b"%" in data: # Remove the rest of comments
+        lines = []
+        for line in data.split(b"\n"):
+            if line.startswith(b"%"): # Some benchmark files end with a "%" line
+                break
+            if line.startswith(b"p"):
+                num_vars = int(line.split()[2])
+            elif not line.startswith(b"c"):
+                lines.append(line)
+        data = b"\n".join(lines)
+    try:
+        if "numpy" in sys.modules or len(data) >= NUMPY_MIN_BYTES:
+            lits, offsets = _tokenise_numpy(data)
+        else:
+            lits, offsets = _tokenise(data)
+    except OverflowError as e:
+        raise ValueError("%s: literal out of range (%s)" % (filename, e))
+    except ValueError as e:
+        raise ValueError("%s: %s" % (filename, e))
+    if lits:
+        num_vars = max(num_vars, max(lits), -min(lits))
+    return CNF(num_vars, len(offsets) - 1, lits, offsets)
+
+
+# Split the clauses with Python built-ins
+def _tokenise(data):
+    tokens = data.split()
+    lits = array("i", map(int, filter(b"0".__ne__, tokens)))
+    ends = [i for i, token in enumerate(tokens) if token == b"0"]
+    offsets = array("i", [0])
+    offsets.extend(map(int.__sub__, ends, range(len(ends)))) # Literals before each 0
+    if len(lits) > offsets[-1]: # Last clause without its 0
+        offsets.append(len(lits))
+    return lits, offsets
+
+
+# Split the clauses with NumPy
+def _tokenise_numpy(data):
+    import numpy as np
+    tokens = np.array(data.split(), dtype = np.int32) # Raises ValueError on a token that is not an integer
+    ends = np.flatnonzero(tokens == 0)
+    if len(tokens) and tokens[-1] != 0: # Last clause without its 0
+        ends = np.append(ends, len(tokens))
+    offsets = np.zeros(len(ends) + 1, dtype = np.int32)
+    offsets[1:] = ends - np.arange(len(ends)) # Literals before each 0
+    return _to_array(tokens[tokens != 0]), _to_array(offsets)
+
+
+# Copy a NumPy int32 array into an array of the array module
+def _to_array(values):
+    result = array("i")
+    result.frombytes(values.astype("int32").tobytes())
+    return result
+
+
+# Build the occurrence index of a formula, returns occ_offsets and occ_clauses
+def occurrences(cnf):
+    if cnf.occ_offsets != None:
+        return cnf.occ_offsets, cnf.occ_clauses
+    size = 2 * cnf.num_vars + 1
+    if "numpy" in sys.modules or len(cnf.lits) * 8 >= NUMPY_MIN_BYTES:
+        import numpy as np
+        lits = np.frombuffer(cnf.lits, dtype = np.int32)
+        keys = lits % size
+        clause_of = np.repeat(np.arange(cnf.num_clauses, dtype = np.int32), np.diff(np.frombuffer(cnf.offsets, dtype = np.int32)))
+        occ_offsets = np.zeros(size + 1, dtype = np.int32)
+        np.cumsum(np.bincount(keys, minlength = size), out = occ_offsets[1:])
+        return _to_array(occ_offsets), _to_array(clause_of[np.argsort(keys, kind = "stable")])
+    counts = [0] * size
+    for lit in cnf.lits:
+        counts[lit] += 1
+    occ_offsets = array("i", [0])
+    occ_offsets.extend(counts)
+    for k in range(size):
+        occ_offsets[k + 1] += occ_offsets[k]
+    position = list(occ_offsets[:-1])
+    occ_clauses = array("i", [0]) * len(cnf.lits)
+    offsets = cnf.offsets
+    for c in range(cnf.num_clauses):
+        for lit in cnf.lits[offsets[c]:offsets[c + 1]]:
+            occ_clauses[position[lit]] = c
+            position[lit] += 1
+    return occ_offsets, occ_clauses
+
+
+# The clauses as lists of literals
+def clause_lists(cnf):
+    lits = cnf.lits.tolist()
+    offsets = cnf.offsets.tolist()
+    return [lits[offsets[c]:offsets[c + 1]] for c in range(cnf.num_clauses)]
+
+
+# The occurrence index as a list with the clauses of each literal, indexed by literal
+def occurrence_lists(cnf):
+    occ_offsets, occ_clauses = occurrences(cnf)
+    occ_offsets = occ_offsets.tolist()
+    occ_clauses = occ_clauses.tolist()
+    return [occ_clauses[occ_offsets[k]:occ_offsets[k + 1]] for k in range(2 * cnf.num_vars + 1)]
+
+
+# Read a DIMACS CNF file through its compiled copy, which is created on the first load
+def load(filename):
+    with open(filename, "rb") as f:
+        path = os.path.join(CACHE_FOLDER, hashlib.sha1(f.read()).hexdigest() + ".cnfb")
+    if os.path.exists(path):
+        cnf = map_cnfb(path)
+        if cnf:
+            return cnf
+    cnf = read(filename)
+    try:
+        write_cnfb(cnf, path)
+    except OSError: # Without a writable cache folder the text is parsed every time
+        return cnf
+    return map_cnfb(path)
+
+
+# Write a formula with its occurrence index as a .cnfb file
+def write_cnfb(cnf, path):
+    occ_offsets, occ_clauses = occurrences(cnf)
+    os.makedirs(os.path.dirname(path), exist_ok = True)
+    tmp = "%s.%i.tmp" % (path, os.getpid()) # Concurrent loads never see a partial file
+    with open(tmp, "wb") as f:
+        f.write(CNFB_HEADER.pack(CNFB_MAGIC, CNFB_VERSION, cnf.num_vars, cnf.num_clauses, len(cnf.lits)))
+        for values in (cnf.lits, cnf.offsets, occ_offsets, occ_clauses):
+            f.write(values)
+    os.replace(tmp, path)
+
+
+# Memory-map a .cnfb file, None if it is not a valid .cnfb of this version
+def map_cnfb(path):
+    if os.path.getsize(path) < CNFB_HEADER.size:
+        return None
+    with open(path, "rb") as f:
+        data = mmap.mmap(f.fileno(), 0, access = mmap.ACCESS_READ)
+    magic, version, num_vars, num_clauses, num_lits = CNFB_HEADER.unpack_from(data)
+    counts = (num_lits, num_clauses + 1, 2 * num_vars + 2, num_lits)
+    if magic != CNFB_MAGIC or version != CNFB_VERSION or len(data) != CNFB_HEADER.size + 4 * sum(counts):
+        return None
+    view = memoryview(data)
+    arrays = []
+    start = CNFB_HEADER.size
+    for count in counts:
+        arrays.append(view[start:start + 4 * count].cast("i"))
+        start += 4 * count
+    return CNF(num_vars, num_clauses, *arrays)
@@ -0,0 +1,322 @@
+#!/usr/bin/python3
+
+"""
+DRAT proof checker, to trust the UNSAT answers of the solvers
+
+check(cnf_path, proof_path) verifies that a DRAT proof refutes a DIMACS CNF formula.
+The proof may be text ("1 -2 0" adds a lemma, "d 1 -2 0" deletes a clause) or binary:
+    "a" or "d", then each literal as a variable-length integer (7 bits per byte, low bits first) of
+    2 * var for a positive literal and 2 * var + 1 for a negative one, then a 0 byte
+
+Backward checking: the proof is replayed forward without checks up to the first empty clause (or up to
+its end if unit propagation then finds a conflict), then the lemmas are visited from the last one back,
+undoing the additions and the deletions. Only the marked lemmas are checked, the empty clause is marked
+and each check marks the clauses its conflict used. A lemma is checked by reverse unit propagation (RUP):
+its negation must propagate to a conflict; otherwise it must be a resolution asymmetric tautology (RAT)
+on its first literal: RUP after adding each clause with the negated literal, minus that literal.
+The input clauses marked at the end are an unsatisfiable core (core trimming), write_core saves it.
+"""
+
+import sys
+import time
+import collections
+
+import dimacs
+
+# Result of a proof check
+# verified: The proof refutes the formula
+# message: What was verified, or why not
+# core: Indexes of the input clauses used by the refutation (empty if not verified)
+# lemmas, checked: Lemmas in the proof (up to the empty clause) and lemmas that needed a check
+Result = collections.namedtuple("Result", ["verified", "message", "core", "lemmas", "checked"])
+
+
+# Read a DRAT proof, returns a list of (deletion, literals) steps
+def read_proof(proof_path):
+    with open(proof_path, "rb") as f:
+        data = f.read()
+    if data[:1] == b"a" or (data[:1] == b"d" and data[1:2] not in (b" ", b"\t")):
+        return _read_binary(data)
+    return _read_text(data)
+
+
+# Parse a binary proof
+def _read_binary(data):
+    steps = []
+    lits = []
+    deletion = None
+    value = shift = 0
+    for byte in data:
+        if deletion == None:
+            if byte != 0x61 and byte != 0x64:
+                raise ValueError("bad binary proof step %r" % chr(byte))
+            deletion = byte == 0x64
+            continue
+        value |= (byte & 0x7f) << shift
+        if byte & 0x80:
+            shift += 7
+            continue
+        if value == 0:
+            steps.append((deletion, lits))
+            lits = []
+            deletion = None
+        else:
+            lits.append(-(value >> 1) if value & 1 else value >> 1)
+        value = shift = 0
+    if deletion != None:
+        raise ValueError("truncated binary proof")
+    return steps
+
+
+# Parse a text proof
+def _read_text(data):
+    steps = []
+    lits = []
+    deletion = False
+    for line in data.split(b"\n"):
+        if line.startswith(b"c"):
+            continue
+        for token in line.split():
+            if token == b"d":
+                deletion = True
+            elif token == b"0":
+                steps.append((deletion, lits))
+                lits = []
+                deletion = False
+            else:
+                lits.append(int(token))
+    return steps
+
+
+# Check a proof, the time limit is in CPU seconds (0 for no limit)
+def check(cnf_path, proof_path, time_limit = 0):
+    cnf = dimacs.load(cnf_path)
+    try:
+        steps = read_proof(proof_path)
+    except (OSError, ValueError) as e:
+        return Result(False, "unreadable proof (%s)" % e, [], 0, 0)
+    num_vars = max([cnf.num_vars] + [abs(lit) for _, lits in steps for lit in lits])
+    checker = Checker(dimacs.clause_lists(cnf), num_vars)
+    return checker.run(steps, time.process_time() + time_limit if time_limit else None)
+
+
+# Write the unsatisfiable core of a verified proof as a DIMACS file
+def write_core(cnf_path, result, core_path):
+    clauses = dimacs.clause_lists(dimacs.load(cnf_path))
+    variables = max([abs(lit) for idx in result.core for lit in clauses[idx]], default = 0)
+    with open(core_path, "w") as f:
+        f.write("p cnf %i %i\n" % (variables, len(result.core)))
+        for idx in result.core:
+            f.write(" ".join(map(str, clauses[idx] + [0])) + "\n")
+
+
+# Clause database of a backward check
+# clauses: input clauses, then the lemmas; the two first literals of a clause are watched
+# active: the clause is in the formula at the current proof step
+# retired: lemmas already undone by the backward check, they are dropped from the watches when found
+# units: indexes of the clauses with a single literal, they are not watched
+# pivots: first literal of each clause as given (the propagation reorders the literals), the RAT pivot of the lemmas
+# value, reason: assignment by literal (1 true, -1 false, 0 unassigned) and reason clause by variable
+class Checker:
+
+    def __init__(self, clauses, num_vars):
+        self.num_inputs = len(clauses)
+        self.clauses = []
+        self.active = []
+        self.retired = []
+        self.marked = []
+        self.units = []
+        self.pivots = []
+        self.watches = [[] for _ in range(2 * num_vars + 1)]
+        self.value = [0] * (2 * num_vars + 1)
+        self.reason = [None] * (num_vars + 1)
+        self.trail = []
+        for clause in clauses:
+            self.add(clause)
+
+    # Add a clause to the database, returns its index
+    def add(self, lits):
+        idx = len(self.clauses)
+        lits = list(dict.fromkeys(lits))
+        self.clauses.append(lits)
+        self.pivots.append(lits[0] if lits else 0)
+        self.active.append(True)
+        self.retired.append(False)
+        self.marked.append(False)
+        if len(lits) == 1:
+            self.units.append(idx)
+        elif len(lits) > 1:
+            self.watches[lits[0]].append(idx)
+            self.watches[lits[1]].append(idx)
+        return idx
+
+    # Replay the proof forward, then check the marked lemmas backward
+    def run(self, steps, deadline):
+        index = collections.defaultdict(list) # Active clauses by literal set, to find the deleted ones
+        for idx, clause in enumerate(self.clauses):
+            index[frozenset(clause)].append(idx)
+        history = [] # (deletion, clause index)
+        empty = None
+        for deletion, lits in steps:
+            if deletion:
+                same = index.get(frozenset(lits))
+                if same: # Deleting a clause that is not in the formula is ignored
+                    idx = same.pop()
+                    self.active[idx] = False
+                    history.append((True, idx))
+                continue
+            idx = self.add(lits)
+            index[frozenset(lits)].append(idx)
+            history.append((False, idx))
+            if not lits:
+                empty = idx
+                break
+        lemmas = sum(1 for deletion, _ in history if not deletion)
+        if empty == None: # Without an empty clause, the formula left must propagate to a conflict
+            empty = self.add([])
+            history.append((False, empty))
+        self.marked[empty] = True
+        checked = 0
+        for deletion, idx in reversed(history):
+            if deletion:
+                self.active[idx] = True
+                continue
+            self.active[idx] = False
+            self.retired[idx] = True
+            if not self.marked[idx]:
+                continue
+            if deadline and time.process_time() > deadline:
+                return Result(False, "time limit after checking %i lemmas" % checked, [], lemmas, checked)
+            checked += 1
+            if not self.verify(idx):
+                lits = [self.pivots[idx]] + [lit for lit in self.clauses[idx] if lit != self.pivots[idx]] if self.clauses[idx] else []
+                if not lits:
+                    return Result(False, "no conflict by unit propagation at the end of the proof", [], lemmas, checked)
+                return Result(False, "lemma %s 0 is neither RUP nor RAT" % " ".join(map(str, lits)), [], lemmas, checked)
+        core = [idx for idx in range(self.num_inputs) if self.marked[idx]]
+        return Result(True, "%i of %i lemmas checked, core of %i clauses" % (checked, lemmas, len(core)), core, lemmas, checked)
+
+    # Check a lemma by RUP, or by RAT on its first literal
+    def verify(self, idx):
+        lits = self.clauses[idx]
+        if self.rup(lits):
+            return True
+        if not lits:
+            return False
+        pivot = self.pivots[idx]
+        candidates = [other for other, clause in enumerate(self.clauses) if self.active[other] and -pivot in clause]
+        for other in candidates:
+            resolvent = lits + [lit for lit in self.clauses[other] if lit != -pivot]
+            if any(-lit in resolvent for lit in resolvent): # A tautology needs no check
+                continue
+            if not self.rup(resolvent):
+                return False
+        for other in candidates:
+            self.marked[other] = True
+        return True
+
+    # Reverse unit propagation: assign the active units and the negated literals, propagate
+    # Marks the clauses of the conflict and returns True if there is one
+    def rup(self, lits):
+        try:
+            for idx in self.units:
+                if self.active[idx] and not self.assign(self.clauses[idx][0], idx):
+                    return True
+            for lit in lits:
+                if not self.assign(-lit, None):
+                    return True
+            confl = self.propagate()
+            if confl == None:
+                return False
+            self.mark([confl], self.clauses[confl])
+            return True
+        finally:
+            for lit in self.trail:
+                self.value[lit] = self.value[-lit] = 0
+                self.reason[abs(lit)] = None
+            self.trail = []
+
+    # Make a literal true, if it is false marks the conflict and returns False
+    def assign(self, lit, reason):
+        if self.value[lit] == 1:
+            return True
+        if self.value[lit] == -1:
+            self.mark([] if reason == None else [reason], [lit] + (self.clauses[reason] if reason != None else []))
+            return False
+        self.value[lit] = 1
+        self.value[-lit] = -1
+        self.reason[abs(lit)] = reason
+        self.trail.append(lit)
+        return True
+
+    # Unit propagation over the active clauses, returns the index of a conflicting clause or None
+    def propagate(self):
+        value = self.value
+        clauses = self.clauses
+        active = self.active
+        retired = self.retired
+        watches = self.watches
+        head = 0
+        while head < len(self.trail):
+            false_lit = -self.trail[head]
+            head += 1
+            watch_list = watches[false_lit]
+            watches[false_lit] = kept = []
+            for k, idx in enumerate(watch_list):
+                clause = clauses[idx]
+                if not active[idx]:
+                    if not retired[idx]: # A deleted clause comes back when its deletion is undone
+                        kept.append(idx)
+                    continue
+                if clause[0] == false_lit:
+                    clause[0] = clause[1]
+                    clause[1] = false_lit
+                first = clause[0]
+                if value[first] == 1:
+                    kept.append(idx)
+                    continue
+                for m in range(2, len(clause)):
+                    lit = clause[m]
+                    if value[lit] != -1:
+                        clause[1] = lit
+                        clause[m] = false_lit
+                        watches[lit].append(idx)
+                        break
+                else:
+                    kept.append(idx)
+                    if value[first] == -1:
+                        kept.extend(watch_list[k + 1:])
+                        return idx
+                    value[first] = 1
+                    value[-first] = -1
+                    self.reason[abs(first)] = idx
+                    self.trail.append(first)
+        return None
+
+    # Mark the clauses of a conflict: the ones given and the reasons of the variables it depends on
+    def mark(self, idxs, lits):
+        for idx in idxs:
+            self.marked[idx] = True
+        seen = set(abs(lit) for lit in lits)
+        for lit in reversed(self.trail):
+            var = abs(lit)
+            if var in seen:
+                reason = self.reason[var]
+                if reason != None:
+                    self.marked[reason] = True
+                    seen.update(abs(other) for other in self.clauses[reason])
+
+
+if __name__ == '__main__' :
+
+    if len(sys.argv) not in (3, 4):
+        sys.exit("Use: %s <cnf-file> <proof-file> [<core-file>]" % sys.argv[0])
+    result = check(sys.argv[1], sys.argv[2])
+    sys.stdout.write("c %s\n" % result.message)
+    if result.verified:
+        if len(sys.argv) == 4:
+            write_core(sys.argv[1], result, sys.argv[3])
+        sys.stdout.write("s VERIFIED\n")
+    else:
+        sys.stdout.write("s NOT VERIFIED\n")
+        sys.exit(1)
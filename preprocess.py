@@ -0,0 +1,230 @@
+#!/usr/bin/python3
+
+"""
+CNF preprocessing for the solvers, run before the search
+
+simplify(clauses, num_vars) takes the clauses as lists of literals and returns a Reduced formula:
+    clauses: the clauses left, the variables keep their numbers (some may no longer appear)
+    units: literals fixed by unit propagation
+    stack: removed clauses needed to rebuild a model, (witness literal, clause) pairs in removal order
+    unsat: True when the empty clause was derived, the other fields are then meaningless
+extend(reduced, model) turns a model of the reduced clauses into a model of the whole formula: the units
+are set and the stack is walked backwards, making the witness true in every clause that is still falsified.
+
+Steps:
+    duplicate literals, tautologies and duplicate clauses are removed while the clauses are loaded
+    unit propagation
+    pure literal elimination, the clauses of a pure literal go to the stack with it as witness
+    forward subsumption, a clause that contains another one is removed
+    blocked clause elimination: a clause is blocked on one of its literals when all its resolvents on that
+        literal are tautologies, it goes to the stack with the literal as witness
+    bounded variable elimination (SatELite): a variable is replaced by the resolvents of its clauses when
+        they are not more than the clauses removed plus the growth allowed, and none is longer than
+        MAX_RESOLVENT literals; all the clauses of the variable go to the stack with its literal as witness
+Clauses implied by the clauses left (duplicates, tautologies, subsumed) are dropped without going to the stack.
+The steps are repeated until they remove nothing, variable and blocked clause elimination stop at the time limit.
+"""
+
+import time
+import collections
+
+GROWTH = 0 # Clauses a variable elimination may add over the ones it removes
+MAX_RESOLVENT = 24 # Longest resolvent a variable elimination may add
+MAX_OCCURRENCES = 64 # Variables with more clauses of one sign are not eliminated
+TIME_LIMIT = 1.0 # CPU seconds for variable and blocked clause elimination
+
+# A preprocessed formula (see the module docstring)
+Reduced = collections.namedtuple("Reduced", ["num_vars", "clauses", "units", "stack", "unsat"])
+
+
+# Simplify a formula, the clauses given are not modified
+# eliminate: run variable and blocked clause elimination, with the growth and time limits given
+def simplify(clauses, num_vars, eliminate = True, growth = GROWTH, time_limit = TIME_LIMIT):
+    formula = Formula(clauses, num_vars)
+    deadline = time.process_time() + time_limit
+    formula.propagate()
+    while not formula.unsat:
+        removed = formula.eliminate_pure() + formula.subsume()
+        if eliminate and time.process_time() < deadline:
+            removed += formula.eliminate_blocked(deadline) + formula.eliminate_variables(growth, deadline)
+        if not removed:
+            break
+    return formula.reduced()
+
+
+# Extend a model of the reduced clauses, given as literals like a v line
+# Returns the model of the whole formula as a list of literals, variable i at position i - 1
+def extend(reduced, model):
+    value = [False] * (reduced.num_vars + 1) # Variables not in the model are false
+    for lit in model:
+        if lit:
+            value[abs(lit)] = lit > 0
+    for lit in reduced.units:
+        value[abs(lit)] = lit > 0
+    for witness, clause in reversed(reduced.stack):
+        if not any(value[abs(lit)] == (lit > 0) for lit in clause):
+            value[abs(witness)] = witness > 0
+    return [var if value[var] else -var for var in range(1, reduced.num_vars + 1)]
+
+
+# Clause database with occurrence lists, the preprocessing steps are its methods
+# clauses: list of clauses (lists of literals), None where a clause was removed
+# occ: set of the clauses of each literal, occ[lit] works for negative literals too
+# value: 1 or -1 for the variables fixed by unit propagation, 0 otherwise
+# touched: variables whose clauses changed since the last variable elimination
+class Formula:
+
+    def __init__(self, clauses, num_vars):
+        self.num_vars = num_vars
+        self.clauses = []
+        self.occ = [set() for _ in range(2 * num_vars + 1)]
+        self.value = [0] * (num_vars + 1)
+        self.units = []
+        self.stack = []
+        self.queue = [] # Units not propagated yet
+        self.unsat = False
+        self.touched = set(range(1, num_vars + 1))
+        seen = set()
+        for clause in clauses:
+            key = frozenset(clause)
+            if key in seen: # Duplicate
+                continue
+            seen.add(key)
+            if not any(-lit in key for lit in key): # Not a tautology
+                self.add(list(dict.fromkeys(clause))) # Without repeated literals, in the same order
+
+    # Add a clause, it is propagated if it is unit
+    def add(self, lits):
+        if not lits:
+            self.unsat = True
+            return
+        idx = len(self.clauses)
+        self.clauses.append(lits)
+        for lit in lits:
+            self.occ[lit].add(idx)
+            self.touched.add(abs(lit))
+        if len(lits) == 1:
+            self.assign(lits[0])
+
+    # Remove a clause from the database
+    def remove(self, idx):
+        for lit in self.clauses[idx]:
+            self.occ[lit].discard(idx)
+            self.touched.add(abs(lit))
+        self.clauses[idx] = None
+
+    # Fix a literal, unless it already has a value (a false one is found by the propagation)
+    def assign(self, lit):
+        if self.value[abs(lit)] == 0:
+            self.value[abs(lit)] = 1 if lit > 0 else -1
+            self.units.append(lit)
+            self.queue.append(lit)
+
+    # Unit propagation: remove the satisfied clauses and the false literals
+    def propagate(self):
+        while self.queue and not self.unsat:
+            lit = self.queue.pop()
+            for idx in list(self.occ[lit]):
+                self.remove(idx)
+            for idx in list(self.occ[-lit]):
+                clause = self.clauses[idx]
+                clause.remove(-lit)
+                self.occ[-lit].discard(idx)
+                if not clause:
+                    self.unsat = True
+                elif len(clause) == 1:
+                    self.assign(clause[0])
+
+    # Pure literal elimination, returns the number of clauses removed
+    def eliminate_pure(self):
+        removed = 0
+        candidates = set(range(1, self.num_vars + 1))
+        while candidates:
+            var = candidates.pop()
+            for lit in (var, -var):
+                if self.occ[lit] and not self.occ[-lit]:
+                    for idx in list(self.occ[lit]):
+                        clause = self.clauses[idx]
+                        self.stack.append((lit, list(clause)))
+                        self.remove(idx)
+                        candidates.update(abs(other) for other in clause if other != lit)
+                        removed += 1
+        return removed
+
+    # Forward subsumption, returns the number of clauses removed
+    # The clauses are visited from short to long and each kept clause is watched in its rarest literal:
+    # a clause is subsumed by a kept one only if it contains the literal where the kept one is watched
+    def subsume(self):
+        removed = 0
+        watches = [[] for _ in range(2 * self.num_vars + 1)]
+        order = sorted((idx for idx, clause in enumerate(self.clauses) if clause), key = lambda idx: len(self.clauses[idx]))
+        for idx in order:
+            clause = self.clauses[idx]
+            lits = set(clause)
+            if any(lits.issuperset(self.clauses[other]) for lit in clause for other in watches[lit]):
+                self.remove(idx)
+                removed += 1
+            else:
+                watches[min(clause, key = lambda lit: len(self.occ[lit]))].append(idx)
+        return removed
+
+    # Resolvent of two clauses on a variable, the clause with the positive literal first
+    def resolve(self, clause, other, var):
+        return list(dict.fromkeys([lit for lit in clause if lit != var] + [lit for lit in other if lit != -var]))
+
+    # Bounded variable elimination, returns the number of clauses removed
+    # The touched variables are tried from the fewest to the most occurrences, until the deadline
+    def eliminate_variables(self, growth, deadline):
+        removed = 0
+        order = sorted((var for var in self.touched if self.value[var] == 0 and (self.occ[var] or self.occ[-var])),
+                       key = lambda var: len(self.occ[var]) * len(self.occ[-var]))
+        self.touched = set()
+        for var in order:
+            if self.unsat or time.process_time() > deadline:
+                break
+            positive, negative = list(self.occ[var]), list(self.occ[-var])
+            if not positive and not negative or len(positive) > MAX_OCCURRENCES or len(negative) > MAX_OCCURRENCES:
+                continue
+            limit = len(positive) + len(negative) + growth
+            pairs = [] # Clauses with a resolvent that is not a tautology
+            for idx in positive:
+                negated = {-lit for lit in self.clauses[idx] if lit != var}
+                pairs.extend((idx, other) for other in negative if negated.isdisjoint(self.clauses[other]))
+                if len(pairs) > limit:
+                    break
+            if len(pairs) > limit:
+                continue
+            resolvents = [self.resolve(self.clauses[idx], self.clauses[other], var) for idx, other in pairs]
+            if any(len(resolvent) > MAX_RESOLVENT for resolvent in resolvents):
+                continue
+            for lit, idxs in ((var, positive), (-var, negative)):
+                for idx in idxs:
+                    self.stack.append((lit, self.clauses[idx]))
+                    self.remove(idx)
+            removed += len(positive) + len(negative)
+            for resolvent in resolvents:
+                self.add(resolvent)
+            self.propagate()
+        return removed
+
+    # Blocked clause elimination, returns the number of clauses removed
+    # Removing a clause may block the clauses with the negation of its other literals, they are checked again
+    def eliminate_blocked(self, deadline):
+        removed = 0
+        pending = set(lit for lit in range(-self.num_vars, self.num_vars + 1) if lit and self.occ[lit])
+        while pending and time.process_time() < deadline:
+            lit = pending.pop()
+            for idx in list(self.occ[lit]):
+                clause = self.clauses[idx]
+                negated = {-other for other in clause if other != lit}
+                if all(not negated.isdisjoint(self.clauses[other]) for other in self.occ[-lit]): # Only tautologies
+                    self.stack.append((lit, clause))
+                    self.remove(idx)
+                    pending.update(-other for other in clause if other != lit and self.occ[-other])
+                    removed += 1
+        return removed
+
+    # The formula left, as a Reduced tuple
+    def reduced(self):
+        clauses = [clause for clause in self.clauses if clause]
+        return Reduced(self.num_vars, clauses, self.units, self.stack, self.unsat)
@@ -6,26 +6,91 @@ import sys
 import os
 import glob
 import re
-import stat
+import shutil
+import argparse
+import statistics
+import tempfile
+import hashlib
+import ast
+import random
+import importlib.util
+import sqlite3
+import signal
+import resource
+import threading
+import selectors
 import subprocess
+import traceback
+import collections
+import multiprocessing
+import concurrent.futures
+import numpy as np
+import dimacs
+import drat
+from time import monotonic
 
 out_file = "out.txt" # Solver output
-limits_file = "tmp-limits.sh" # Limits script file
+proof_file = "proof.drat" # DRAT proof of the UNSAT answers, the solvers get its path in SAT_PROOF
+python = "python3" # Interpreter that runs the solvers
 timeout = 10 # Timeout for each run
+memory_limit = 0 # Memory limit for each run in MB (0 for no limit)
+wall_limit = 3 * timeout # Wall time limit for each run, for solvers that block without using CPU
 inc_to = 2 # Multiplier for timeout
 inc_bug = 10000 # Multiplier for bug
 verbose = False # Verbose flag
+jobs = 1 # Number of instances run concurrently
+runs = 1 # Number of runs of each solver on each instance
+in_process = False # Run the solvers with an adapter in a fork of the race
+instances = {} # Parsed benchmark files
+hashes = {} # Content hash of the solver, module and benchmark files
+modules = {} # Solver modules imported for the in-process runs
+solver_settings = ["SAT_PROGRESS", "REALLYSAT_", "RACESATWINNER_"] # Environment variables (or their prefix) that change the runs of the solvers
 
-# Parse CPU time in file
-def get_time(out_file):
-    time = None
-    r = re.compile(r"^user (\d+\.\d+)")
-    for l in open(out_file, "r"):
-        s = re.search(r, l)
-        if s:
-            time = s.group(1)
-            break
-    return time
+# Launcher of the solvers, run with "python3 -S -c" in the run directory: CPU seconds, memory MB, report fd, solver command
+# A process forked from the race starts with its resident memory and keeps it as peak (ru_maxrss), even after exec, so
+# the solver is forked from this small process instead. The solver writes its pid to the report pipe once it is in its
+# own session, the launcher waits for it and writes its exit status and resource usage
+launcher = """
+import os, sys, resource
+cpu, memory, report = int(sys.argv[1]), int(sys.argv[2]), int(sys.argv[3])
+pid = os.fork()
+if pid == 0:
+    os.setsid()
+    os.write(report, b"%i\\n" % os.getpid())
+    os.close(report)
+    resource.setrlimit(resource.RLIMIT_CPU, (cpu, cpu))
+    if memory:
+        resource.setrlimit(resource.RLIMIT_AS, (memory * 1024 * 1024, memory * 1024 * 1024))
+    os.execvp(sys.argv[4], sys.argv[4:])
+_, status, usage = os.wait4(pid, 0)
+os.write(report, b"%i %r %r %i\\n" % (status, usage.ru_utime, usage.ru_stime, usage.ru_maxrss))
+"""
+
+# A solver started by the launcher
+# process: Popen of the launcher, its stdout is the solver output when it is a pipe
+# pid: Solver pid, also its session and process group
+# report: Pipe with the exit status and resource usage of the solver, written when it ends
+Launch = collections.namedtuple("Launch", ["process", "pid", "report"])
+
+# Resources used by a solver run
+# out_file: Solver output
+# user, sys, wall: User CPU, system CPU and wall time in seconds
+# max_rss: Peak resident memory in MB
+# killed: The run was stopped by the wall time watchdog
+# load: CPU time reading the instance, only measured apart in the in-process runs (user is then the search time)
+Run = collections.namedtuple("Run", ["out_file", "user", "sys", "wall", "max_rss", "killed", "load"], defaults = [0.0])
+
+# In-process entry points of the solvers: solver file -> (read the instance, search a model)
+# The search returns the model as a list of literals ordered by variable (a leading 0 is ignored), or None
+adapters = {
+    "reallysat.py": (lambda m, bf: m.get_cnf(bf), lambda m, cnf: m.solve(*cnf)),
+    "FiaauunSat.py": (lambda m, bf: m.read_file(bf), lambda m, cnf: m.walksat(*cnf)),
+    "MVP_SAT.py": (lambda m, bf: m.read_benchmark(bf), lambda m, problem: problem.walksat(5, 30000)),
+    "RMSolver.py": (lambda m, bf: m.generateSolver(open(bf, "r")), lambda m, solver: solver.solve()),
+    "RaceSatWinner.py": (lambda m, bf: m.raceSatWinner.getFormula(open(bf, "r")), lambda m, cnf: cnf.solver()),
+    "numpy_walksat.py": (lambda m, bf: m.load_formula(bf), lambda m, formula: m.walksat(formula)),
+    "numpy_batch.py": (lambda m, bf: m.load_formula(bf), lambda m, formula: m.batch_walksat(formula)),
+}
 
 # Parse SATISFIABLE in file
 def get_sat(out_file):
@@ -36,40 +101,86 @@ def get_sat(out_file):
             return True
     return False
 
+# Parse UNSATISFIABLE in file
+def get_unsat(out_file):
+    r = re.compile(r"^s UNSATISFIABLE")
+    for l in open(out_file, "r"):
+        if re.search(r, l):
+            return True
+    return False
+
+# Parse the result of the proof check that run_instance adds after an UNSATISFIABLE answer
+# Returns (status, details), status is "verified", "rejected" or "unchecked", None if there is no check
+def get_proof_check(out_file):
+    r = re.compile(r"^c race proof (verified|rejected|unchecked): (.*)")
+    for l in open(out_file, "r"):
+        s = re.search(r, l)
+        if s:
+            return s.group(1), s.group(2)
+    return None
+
 # Parse solver solution in file
 def get_solution(out_file):
     r = re.compile(r"^v (.+)")
     for l in open(out_file, "r"):
         s = re.search(r, l)
         if s:
-            sol = s.group(1).split()
-            sol.insert(0, "0") # Adds a 0 at the begginig to make variable 'i' at potition 'i'
-            try:
-                return list(map(int, sol))
-            except:
-                return None
-            break
+            return parse_solution(s.group(1))
     return None
 
+# Parse the values of a solution line
+def parse_solution(values):
+    sol = values.split()
+    sol.insert(0, "0") # Adds a 0 at the begginig to make variable 'i' at potition 'i'
+    try:
+        return list(map(int, sol))
+    except:
+        return None
+
+# Parse the progress lines "c o <flips> <unsat clauses> <CPU seconds>" in file
+def get_progress(out_file):
+    r = re.compile(r"^c o (\d+) (\d+) (\d+(?:\.\d+)?)")
+    progress = []
+    for l in open(out_file, "r"):
+        s = re.search(r, l)
+        if s:
+            progress.append((int(s.group(1)), int(s.group(2)), float(s.group(3))))
+    return progress
+
+# Write the progress of a run as a CSV file in the curves folder
+def save_curve(curves_folder, solver, benchmark_file, run_id, out_file):
+    progress = get_progress(out_file)
+    if progress:
+        name = "%s.%s.%s.csv" % (os.path.basename(solver)[:-3], os.path.basename(benchmark_file)[:-4], run_id)
+        with open(os.path.join(curves_folder, name), "w") as f:
+            f.write("flips,unsat,time\n")
+            for flips, unsat, elapsed in progress:
+                f.write("%i,%i,%.3f\n" % (flips, unsat, elapsed))
+
+# Read a benchmark file into a flat literal array and the clause offsets, each file is read once per race
+# The literals of clause i are lits[offsets[i]:offsets[i + 1]]
+def load_instance(benchmark_file):
+    if benchmark_file not in instances:
+        cnf = dimacs.load(benchmark_file)
+        lits = np.frombuffer(cnf.lits, dtype = np.int32)
+        offsets = np.frombuffer(cnf.offsets, dtype = np.int32)
+        instances[benchmark_file] = (lits, np.abs(lits), offsets, cnf.num_vars)
+    return instances[benchmark_file]
+
 # Check if the solution is a real solution to the benchmark file
+# Returns the indexes of the falsified clauses, empty if the solution is a model
 def check_solution(solution, benchmark_file):
-    instance = open(benchmark_file, "r")
-    for l in instance:
-        if l[0] in ["c", "p"]: # Pass comments and program line
-            continue
-        sl = list(map(int, l.split()))
-        sl.pop() # Remove last 0
-        length = len(sl)
-        for lit in sl:
-            if lit == solution[abs(lit)]: # Satisfies clause
-                break
-            else:
-                length -= 1
-        if length == 0: # Falsified clause
-            return False
-    return True
+    lits, variables, offsets, num_vars = load_instance(benchmark_file)
+    # Value of variable 'i' at position 'i', missing variables are never satisfied
+    values = np.zeros(num_vars + 1, dtype = np.int64)
+    given = solution[:num_vars + 1]
+    values[:len(given)] = given
+    sat = np.zeros(len(lits) + 1, dtype = np.int64)
+    np.cumsum(values[variables] == lits, out = sat[1:])
+    return np.flatnonzero(sat[offsets[1:]] == sat[offsets[:-1]]) # Clauses without satisfied literals
 
 # Check the correctness of the solution
+# Returns the falsified clauses of the solution or None if there is no solution
 def check_correctness(benchmark_file, out_file):
     sat = get_sat(out_file)
     if sat:
@@ -78,79 +189,595 @@ def check_correctness(benchmark_file, out_file):
             return check_solution(solution, benchmark_file)
     return None
 
-if __name__ == '__main__' :
+# Apply the CPU and memory limits to the in-process runs, the launcher applies them to the other solvers
+def set_limits():
+    resource.setrlimit(resource.RLIMIT_CPU, (timeout, timeout))
+    if memory_limit:
+        resource.setrlimit(resource.RLIMIT_AS, (memory_limit * 1024 * 1024, memory_limit * 1024 * 1024))
+
+# Start a solver with the launcher, in its own session (so it can be killed with all its children) under the limits
+# The seed is given to the solver in the SAT_SEED environment variable
+def start_solver(solver, benchmark_file, run_dir, output, seed = None):
+    env = os.environ.copy()
+    if seed != None:
+        env["SAT_SEED"] = str(seed)
+    env["SAT_PROOF"] = os.path.join(os.path.abspath(run_dir), proof_file)
+    read_fd, write_fd = os.pipe()
+    try:
+        process = subprocess.Popen([python, "-S", "-c", launcher, str(timeout), str(memory_limit), str(write_fd), python, solver, benchmark_file],
+            stdout = output, stderr = subprocess.STDOUT, cwd = run_dir, env = env, pass_fds = (write_fd,), start_new_session = True)
+    finally:
+        os.close(write_fd)
+    report = os.fdopen(read_fd, "rb")
+    line = report.readline()
+    if not line:
+        report.close()
+        process.wait()
+        raise RuntimeError("the launcher of %s ended with status %i" % (solver, process.returncode))
+    return Launch(process, int(line), report)
+
+# Kill a solver and all its children
+def kill_solver(pid):
+    try:
+        os.killpg(pid, signal.SIGKILL)
+    except ProcessLookupError:
+        pass
+
+# Start the watchdog that kills a solver after the wall time limit, returns it and the event it sets when it kills
+def start_watchdog(pid):
+    killed = threading.Event()
+    watchdog = threading.Timer(wall_limit, lambda: (killed.set(), kill_solver(pid)))
+    watchdog.start()
+    return watchdog, killed
 
-    if len(sys.argv) < 3 or len(sys.argv) > 4:
-        sys.exit("Use: %s <benchmark_folder> <solver>" % sys.argv[0])
+# Wait for a solver started by the launcher and get its resource usage, the watchdog kills it after the wall time limit
+# Returns the run and the exit status of the solver (as given by wait)
+def wait_solver(launch, start, run_out):
+    watchdog, killed = start_watchdog(launch.pid)
+    try:
+        line = launch.report.readline()
+        launch.process.wait()
+    finally:
+        watchdog.cancel()
+        launch.report.close()
+    wall = monotonic() - start
+    if not line:
+        raise RuntimeError("the launcher of %s ended with status %i without a report" % (run_out, launch.process.returncode))
+    status, user, sys_time, max_rss = line.split()
+    return Run(run_out, float(user), float(sys_time), wall, int(max_rss) / 1024, killed.is_set()), int(status)
 
-    if len(sys.argv) == 4:
-        option = sys.argv[3]
-        if option == 'v':
-            verbose = True
+# Wait for an in-process run and get its resource usage, the watchdog kills it after the wall time limit
+# Its memory includes the pages of the race, it is a fork of it
+# Returns the run and the exit status of the fork
+def wait_fork(pid, start, run_out):
+    watchdog, killed = start_watchdog(pid)
+    try:
+        _, status, usage = os.wait4(pid, 0)
+    finally:
+        watchdog.cancel()
+    wall = monotonic() - start
+    return Run(run_out, usage.ru_utime, usage.ru_stime, wall, usage.ru_maxrss / 1024, killed.is_set()), status
 
-    benchmark_folder = sys.argv[1]
-    solver = sys.argv[2]
+# Import a solver with an in-process adapter once, None if the solver has no adapter
+def load_solver(solver):
+    if solver not in modules:
+        modules[solver] = None
+        if os.path.basename(solver) in adapters:
+            name = os.path.basename(solver)[:-3].replace("-", "_")
+            spec = importlib.util.spec_from_file_location(name, solver)
+            module = importlib.util.module_from_spec(spec)
+            spec.loader.exec_module(module)
+            modules[solver] = module
+    return modules[solver]
+
+# CPU time used by this process
+def cpu_time():
+    return resource.getrusage(resource.RUSAGE_SELF).ru_utime
+
+# Search a model in a fork of the race, the solver module is already imported
+# Runs in the child process, it never returns
+def fork_solver(solver, benchmark_file, run_dir, output, seed):
+    try:
+        os.setsid() # Own session, like the solvers started as processes
+        os.chdir(run_dir)
+        os.dup2(output.fileno(), 1)
+        os.dup2(output.fileno(), 2)
+        set_limits()
+        random.seed(str(seed) if seed != None else None) # Same seed the solver takes from SAT_SEED
+        module = modules[solver]
+        read, search = adapters[os.path.basename(solver)]
+        start = cpu_time()
+        cnf = read(module, benchmark_file)
+        loaded = cpu_time()
+        model = search(module, cnf)
+        searched = cpu_time()
+        sys.stdout.write("c load time %.6f\nc search time %.6f\n" % (loaded - start, searched - loaded))
+        if model:
+            sys.stdout.write("s SATISFIABLE\nv %s 0\n" % " ".join(str(lit) for lit in model if lit != 0))
+        else:
+            sys.stdout.write("s UNKNOWN\n")
+        sys.stdout.flush()
+    except BaseException:
+        traceback.print_exc()
+        sys.stderr.flush()
+        os._exit(1)
+    os._exit(0)
+
+# Parse the load and search CPU times of an in-process run
+def get_search_time(out_file):
+    r = re.compile(r"^c (load|search) time (\d+\.\d+)")
+    times = {}
+    for l in open(out_file, "r"):
+        s = re.search(r, l)
+        if s:
+            times[s.group(1)] = float(s.group(2))
+    return times.get("load"), times.get("search")
+
+# Run the solver on one instance inside its own run directory
+def run_instance(job):
+    run_dir, solver, benchmark_file, seed = job
+    os.mkdir(run_dir)
+    run_out = os.path.join(run_dir, out_file)
+    with open(run_out, 'w') as output:
+        start = monotonic()
+        if in_process and load_solver(solver):
+            sys.stdout.flush() # The child must not repeat the pending output
+            sys.stderr.flush()
+            pid = os.fork()
+            if pid == 0:
+                fork_solver(solver, benchmark_file, run_dir, output, seed)
+            run, _ = wait_fork(pid, start, run_out)
+            load, search = get_search_time(run_out)
+            if search != None:
+                run = run._replace(user = search, load = load)
+        else:
+            launch = start_solver(solver, benchmark_file, run_dir, output, seed)
+            run, _ = wait_solver(launch, start, run_out)
+    if get_unsat(run_out):
+        check_proof(benchmark_file, run_dir, run_out)
+    return run
+
+# Check the DRAT proof of an UNSATISFIABLE answer and add the result to the solver output
+# The check gets the CPU time limit of the run, its time is not counted as solver time
+def check_proof(benchmark_file, run_dir, run_out):
+    proof = os.path.join(run_dir, proof_file)
+    if not os.path.exists(proof):
+        line = "unchecked: no proof in %s" % proof_file
+    else:
+        result = drat.check(benchmark_file, proof, timeout)
+        if result.verified:
+            line = "verified: " + result.message
+        elif result.message.startswith("time limit"):
+            line = "unchecked: " + result.message
+        else:
+            line = "rejected: " + result.message
+    with open(run_out, "a") as output:
+        output.write("c race proof %s\n" % line)
 
-    # Check benchmark folder and solver
+# Summary of the runs of a solver on an instance
+# The time of a run without solution is the timeout * inc_to (PAR-2 with the default inc_to)
+def summary(times, solved):
+    median = statistics.median(times)
+    if len(times) > 1:
+        q1, _, q3 = statistics.quantiles(times, n = 4, method = "inclusive")
+    else:
+        q1 = q3 = median
+    par = sum(times) / len(times)
+    return par, "median = %.2f, IQR = %.2f, solved = %i/%i (%.0f%%), PAR-%i = %.2f\n" % (median, q3 - q1, solved, len(times), 100 * solved / len(times), inc_to, par)
+
+# Get the solvers from a list of solver files and folders
+def find_solvers(paths):
+    solvers = []
+    for path in paths:
+        if os.path.isdir(path):
+            solvers += sorted(glob.glob("%s/*.py" % os.path.abspath(path)))
+        elif os.path.isfile(path):
+            solvers.append(os.path.abspath(path))
+        else:
+            sys.exit("ERROR: Solver not found (%s)." % path)
+    if not solvers:
+        sys.exit("ERROR: Solvers in %s not found." % " ".join(paths))
+    return solvers
+
+# Show the time of every solver for every instance and the ranking by total time
+# The solvers stopped by the racing mode go last, they miss the times of the instances they did not run
+def show_leaderboard(solvers, benchmark_files, times, stopped = ()):
+    names = [os.path.basename(s) for s in solvers]
+    width = max(len(os.path.basename(bf)) for bf in benchmark_files)
+    cols = [max(len(n), 9) for n in names]
+    sys.stdout.write("\n%s  %s\n" % ("Instance".ljust(width), "  ".join(n.rjust(c) for n, c in zip(names, cols))))
+    for bf in benchmark_files:
+        row = ["%.2f" % times[s][bf] if bf in times[s] else "-" for s in solvers]
+        sys.stdout.write("%s  %s\n" % (os.path.basename(bf).ljust(width), "  ".join(t.rjust(c) for t, c in zip(row, cols))))
+    sys.stdout.write("\nRanking:\n")
+    totals = sorted((s in stopped, sum(times[s].values()), n) for s, n in zip(solvers, names))
+    for pos, (is_stopped, total_time, name) in enumerate(totals, 1):
+        if is_stopped:
+            sys.stdout.write("%2i. %s stopped, partial time = %.2f\n" % (pos, name, total_time))
+        else:
+            sys.stdout.write("%2i. %s total time = %.2f\n" % (pos, name, total_time))
+
+# Predicted difficulty of the instances: the mean stored CPU time when the store has runs of every
+# instance, otherwise the number of literals
+def difficulty(benchmark_files, db = None):
+    if db:
+        stored = {}
+        for bf in benchmark_files:
+            stored[bf] = db.execute("SELECT AVG(user) FROM runs WHERE instance = ?", (file_hash(bf),)).fetchone()[0]
+        if None not in stored.values():
+            return stored
+    return {bf: len(load_instance(bf)[0]) for bf in benchmark_files}
+
+# Run the jobs in a pool of workers, yielding the runs in job order
+def schedule(job_list, workers):
+    if workers == 1: # Serial run, each job starts when its result is requested
+        for job in job_list:
+            yield run_instance(job)
+        return
+    # Forked workers share the settings of the race
+    executor = concurrent.futures.ProcessPoolExecutor(max_workers = workers, mp_context = multiprocessing.get_context("fork"))
+    try:
+        futures = [executor.submit(run_instance, job) for job in job_list]
+        for future in futures:
+            yield future.result()
+    finally:
+        executor.shutdown(wait = True, cancel_futures = True)
+
+# Hash of the content of a file
+def file_hash(path):
+    if path not in hashes:
+        with open(path, "rb") as f:
+            hashes[path] = hashlib.sha256(f.read()).hexdigest()
+    return hashes[path]
+
+# Local modules imported by a solver, directly or through other local modules, found in its import statements
+# They are searched next to the solver and in the folder above (where the solvers find the shared modules like dimacs)
+def local_imports(solver):
+    folders = [os.path.dirname(os.path.abspath(solver))]
+    folders.append(os.path.dirname(folders[0]))
+    found = set()
+    pending = [solver]
+    while pending:
+        try:
+            with open(pending.pop(), "rb") as f:
+                tree = ast.parse(f.read())
+        except (OSError, SyntaxError, ValueError):
+            continue
+        names = set()
+        for node in ast.walk(tree):
+            if isinstance(node, ast.Import):
+                names.update(alias.name.split(".")[0] for alias in node.names)
+            elif isinstance(node, ast.ImportFrom) and node.module and not node.level:
+                names.add(node.module.split(".")[0])
+        for name in names:
+            for folder in folders:
+                for path in (os.path.join(folder, name + ".py"), os.path.join(folder, name, "__init__.py")):
+                    if os.path.isfile(path) and path not in found:
+                        found.add(path)
+                        pending.append(path)
+    found.discard(os.path.abspath(solver))
+    return sorted(found)
+
+# Content hash of a solver and its local imports, so a change in a shared module is a new solver for the store
+def solver_hash(solver):
+    imports = local_imports(solver)
+    if not imports:
+        return file_hash(solver)
+    return hashlib.sha256(" ".join(file_hash(path) for path in [solver] + imports).encode()).hexdigest()
+
+# Open the results store, runs are kept by solver and instance content, seed and limits
+def open_store(path):
+    db = sqlite3.connect(path)
+    db.execute("""CREATE TABLE IF NOT EXISTS runs (
+        solver TEXT, instance TEXT, seed INTEGER, limits TEXT,
+        solver_name TEXT, instance_name TEXT,
+        user REAL, sys REAL, wall REAL, max_rss REAL, killed INTEGER, load REAL, output TEXT,
+        PRIMARY KEY (solver, instance, seed, limits))""")
+    return db
+
+# Solver settings given in the environment, "name=value" sorted by name
+def get_settings():
+    return ["%s=%s" % (name, value) for name, value in sorted(os.environ.items()) if name.startswith(tuple(solver_settings))]
+
+# Key of a run in the results store, the limits include the solver settings
+def store_key(solver, benchmark_file, seed):
+    in_process_run = in_process and os.path.basename(solver) in adapters
+    limits = "cpu %i memory %i wall %g%s" % (timeout, memory_limit, wall_limit, " in-process" if in_process_run else "")
+    return (solver_hash(solver), file_hash(benchmark_file), seed, " ".join([limits] + get_settings()))
+
+# Get a run from the results store and write its output in the run directory, None if it is not stored
+def load_run(db, job):
+    run_dir, solver, benchmark_file, seed = job
+    row = db.execute("SELECT user, sys, wall, max_rss, killed, load, output FROM runs WHERE solver = ? AND instance = ? AND seed = ? AND limits = ?", store_key(solver, benchmark_file, seed)).fetchone()
+    if row == None:
+        return None
+    os.mkdir(run_dir)
+    run_out = os.path.join(run_dir, out_file)
+    with open(run_out, "w") as output:
+        output.write(row[6])
+    return Run(run_out, row[0], row[1], row[2], row[3], bool(row[4]), row[5])
+
+# Save a run in the results store
+def save_run(db, job, run):
+    run_dir, solver, benchmark_file, seed = job
+    with open(run.out_file, "r", errors = "replace") as output:
+        text = output.read()
+    db.execute("INSERT OR REPLACE INTO runs VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+        store_key(solver, benchmark_file, seed) + (os.path.basename(solver), os.path.basename(benchmark_file), run.user, run.sys, run.wall, run.max_rss, run.killed, run.load, text))
+    db.commit()
+
+# Get the runs of the jobs in job order, only the jobs missing in the store (if any) are run
+def collect(job_list, workers, db = None):
+    stored = [load_run(db, job) if db else None for job in job_list]
+    results = schedule([job for job, run in zip(job_list, stored) if run == None], workers)
+    try:
+        for job, run in zip(job_list, stored):
+            if run == None:
+                run = next(results)
+                if db:
+                    save_run(db, job, run)
+            yield run
+    finally:
+        results.close()
+
+# Run the solvers concurrently on one instance until one of them gives a correct model
+# Returns the winner solver (None if there is no correct model), the wall time, the wrong solvers and if the wall time limit stopped them
+def run_portfolio(solvers, benchmark_file, work_dir, seed = None):
+    sel = selectors.DefaultSelector()
+    procs = []
+    start = monotonic()
+    for i, solver in enumerate(solvers):
+        run_dir = os.path.join(work_dir, str(i))
+        os.mkdir(run_dir)
+        launch = start_solver(solver, benchmark_file, run_dir, subprocess.PIPE, seed)
+        procs.append(launch)
+        sel.register(launch.process.stdout, selectors.EVENT_READ, [solver, b"", False]) # Solver, pending output, SATISFIABLE seen
+    winner = None
+    wrong = []
+    killed = False
+    try:
+        while winner == None and sel.get_map():
+            left = start + wall_limit - monotonic() # The wall time limit of the runs applies to every member
+            if left <= 0:
+                killed = True
+                break
+            for key, _ in sel.select(left):
+                state = key.data
+                data = os.read(key.fd, 65536)
+                if not data: # Solver finished
+                    sel.unregister(key.fileobj)
+                    continue
+                lines = (state[1] + data).split(b"\n")
+                state[1] = lines.pop() # Keep the incomplete line
+                for l in lines:
+                    l = l.decode(errors = "replace")
+                    if l.startswith("s SATISFIABLE"):
+                        state[2] = True
+                    elif l.startswith("v ") and state[2]:
+                        solution = parse_solution(l[2:])
+                        if solution != None and len(check_solution(solution, benchmark_file)) == 0:
+                            winner = state[0]
+                        else:
+                            wrong.append(state[0])
+                        sel.unregister(key.fileobj) # Only the first solution line counts
+                        break
+                if winner != None:
+                    break
+        wall = monotonic() - start
+    finally:
+        # Stop the rest of the portfolio
+        for launch in procs:
+            kill_solver(launch.pid)
+            launch.process.wait()
+            launch.process.stdout.close()
+            launch.report.close()
+        sel.close()
+    return winner, wall, wrong, killed
+
+# Score a run, returns the time, if the solution is correct and the result message
+def score(benchmark_file, run):
+    usage = " (sys %.2f, wall %.2f, memory %.1f MB)" % (run.sys, run.wall, run.max_rss)
+    if run.load:
+        usage = " (load %.2f, sys %.2f, wall %.2f, memory %.1f MB)" % (run.load, run.sys, run.wall, run.max_rss)
+    falsified = check_correctness(benchmark_file, run.out_file)
+    proof_check = get_proof_check(run.out_file) if falsified is None else None
+    if proof_check != None: # The solver answered UNSATISFIABLE
+        status, details = proof_check
+        if status == "verified":
+            time = run.user
+            return time, True, "OK! UNSAT proof verified (%s) time = %.2f%s\n" % (details, time, usage)
+        elif status == "rejected":
+            time = timeout * inc_bug
+            return time, False, "Wrong UNSAT! proof rejected (%s) time = %i%s\n" % (details, time, usage)
+        time = timeout * inc_to
+        return time, False, "UNSAT not verified! (%s) time = %i%s\n" % (details, time, usage)
+    if falsified is None: # There is no solution
+        time = timeout * inc_to
+        if run.killed:
+            return time, False, "Wall time limit exceeded! time = %i%s\n" % (time, usage)
+        return time, False, "No solution found! time = %i%s\n" % (time, usage)
+    elif len(falsified) == 0: # The solution is correct
+        time = run.user
+        return time, True, "OK! time = %.2f%s\n" % (time, usage)
+    else: # There is a bug in the solution
+        time = timeout * inc_bug
+        shown = " ".join(map(str, falsified[:10])) + (" ..." if len(falsified) > 10 else "")
+        return time, False, "Wrong solution! %i falsified clauses (%s) time = %i%s\n" % (len(falsified), shown, time, usage)
+
+if __name__ == '__main__' :
+
+    parser = argparse.ArgumentParser(description = "Race SAT solvers over the instances of a benchmark folder")
+    parser.add_argument("benchmark_folder", help = "folder with the .cnf instances (or a single .cnf file)")
+    parser.add_argument("solvers", nargs = "+", help = "solver files or folders of solvers to run (a last v shows the solver output)")
+    parser.add_argument("-v", "--verbose", action = "store_true", help = "show the solver output")
+    parser.add_argument("-p", "--portfolio", action = "store_true", help = "run the solvers concurrently on each instance, the first correct model wins (once per instance, without --runs, --store, --jobs, --racing, --in-process or --curves)")
+    parser.add_argument("-t", "--timeout", type = int, default = timeout, help = "CPU time limit for each run in seconds (default %i)" % timeout)
+    parser.add_argument("-m", "--memory", type = int, default = memory_limit, help = "memory limit for each run in MB, 0 for no limit (default %i)" % memory_limit)
+    parser.add_argument("-w", "--wall", type = float, help = "wall time limit for each run in seconds (default 3 times the timeout)")
+    parser.add_argument("-r", "--runs", type = int, default = runs, help = "runs of each solver on each instance (default %i)" % runs)
+    parser.add_argument("-s", "--seed-base", type = int, help = "seed of the first run, run k gets seed + k (default: solvers seed themselves)")
+    parser.add_argument("-d", "--store", help = "SQLite results store, only runs missing in the store are executed (runs are seeded, from 0 unless --seed-base)")
+    parser.add_argument("-i", "--in-process", action = "store_true", help = "import the solvers with an adapter (%s) once and run them in forks of the race, timing only the search (their memory includes the race)" % ", ".join(sorted(adapters)))
+    parser.add_argument("-c", "--curves", help = "folder for the time vs unsatisfied clauses curves of each run (CSV)")
+    parser.add_argument("-e", "--every", type = float, default = 0.1, help = "CPU seconds between the progress lines of the solvers (default 0.1)")
+    parser.add_argument("-R", "--racing", action = "store_true", help = "run the solvers one after another on the hardest instances first and stop a solver once its partial time exceeds the best total")
+    parser.add_argument("-j", "--jobs", type = int, default = jobs, help = "runs executed concurrently, 0 for one per core (default %i)" % jobs)
+    args = parser.parse_intermixed_args()
+    if args.portfolio:
+        # The portfolio runs every instance once with all the solvers together, these options do not apply to it
+        ignored = [option for option, given in (("--runs", args.runs != runs), ("--store", args.store), ("--jobs", args.jobs != jobs),
+            ("--racing", args.racing), ("--in-process", args.in_process), ("--curves", args.curves)) if given]
+        if ignored:
+            parser.error("--portfolio can not be used with %s" % ", ".join(ignored))
+
+    if len(args.solvers) > 1 and args.solvers[-1] == 'v' and not os.path.exists('v'):
+        args.solvers.pop()
+        args.verbose = True
+    verbose = args.verbose
+    timeout = args.timeout
+    memory_limit = args.memory
+    wall_limit = args.wall if args.wall else 3 * timeout
+    jobs = args.jobs if args.jobs > 0 else os.cpu_count()
+    runs = max(args.runs, 1)
+    if args.curves:
+        os.makedirs(args.curves, exist_ok = True)
+        os.environ["SAT_PROGRESS"] = str(args.every) # Solvers with progress lines read it
+    in_process = args.in_process
+    if args.store and args.seed_base == None:
+        args.seed_base = 0 # Stored runs must be reproducible
+    if args.seed_base != None:
+        seeds = [args.seed_base + k for k in range(runs)]
+    else:
+        seeds = [None] * runs
+    benchmark_folder = args.benchmark_folder
+
+    # Check benchmark folder and solvers
     if os.path.isdir(benchmark_folder):
         benchmark_folder = os.path.abspath(benchmark_folder)
+    elif os.path.isfile(benchmark_folder):
+        benchmark_folder = os.path.abspath(benchmark_folder)
     else:
         sys.exit("ERROR: Benchmark folder not found (%s)." % benchmark_folder)
 
-    if os.path.isfile(solver):
-        solver = os.path.abspath(solver)
-    else:
-        sys.exit("ERROR: Solver not found (%s)." % solver)
+    solvers = find_solvers(args.solvers)
+    race = len(solvers) > 1
+    if in_process:
+        for solver in solvers: # Imported before the workers are forked
+            load_solver(solver)
 
     # Check solver
     # if not (os.stat(solver).st_mode & stat.S_IXUSR):
     #     sys.exit("ERROR: Solver %s without execute (x) permission." % solver)
-    #Create file limits.sh
-    with open(limits_file, "w") as f:
-        f.write("#!/bin/bash\nulimit -t %i\npython3 $1 $2\n" % timeout)
-    st = os.stat(limits_file)
-    os.chmod(limits_file, st.st_mode | stat.S_IXUSR)
 
     # Get all the instances
-    benchmark_files = glob.glob("%s/*.cnf" % benchmark_folder)
+    if os.path.isfile(benchmark_folder):
+        benchmark_files = [benchmark_folder]
+    else:
+        benchmark_files = glob.glob("%s/*.cnf" % benchmark_folder)
     if not benchmark_files:
         sys.exit("ERROR: Benchmark files in \"%s/*.cnf\" not found." % benchmark_folder)
     benchmark_files.sort()
-    total_time = 0
-    # Run the solver for al the instances
-    for bf in benchmark_files:
-        sys.stdout.write("File %s... " % os.path.basename(bf))
-        sys.stdout.flush()
-        # Run the solver under limits
-        with open(out_file, 'w') as output:
-            subprocess.run(['time', '-p', './%s' % limits_file, solver, bf], stdout = output, stderr = subprocess.STDOUT)
-        if verbose:
-            with open(out_file, 'r') as output:
-                sys.stdout.write('\n')
-                for l in output.readlines():
-                    sys.stdout.write(l)
-        #Check result
-        correct = check_correctness(bf, out_file)
-        if correct == True: # The solution is correct
-            #Get Time
-            time = get_time(out_file)
-            if time == None: # This should not happend
+
+    if args.portfolio:
+        # Run the whole portfolio on every instance, one instance at a time
+        total_time = 0
+        for i, bf in enumerate(benchmark_files):
+            sys.stdout.write("File %s... " % os.path.basename(bf))
+            sys.stdout.flush()
+            work_dir = tempfile.mkdtemp(prefix = "race-")
+            try:
+                winner, wall, wrong, killed = run_portfolio(solvers, bf, work_dir, seeds[0])
+            finally:
+                shutil.rmtree(work_dir)
+            for solver in wrong:
+                sys.stdout.write("Wrong solution from %s! " % os.path.basename(solver))
+            if winner != None:
+                time = wall
+                sys.stdout.write("OK! solver %s, wall time = %.2f\n" % (os.path.basename(winner), time))
+            elif killed:
                 time = timeout * inc_to
-                sys.stdout.write("Time not found! time = %.2f\n" % time)
+                sys.stdout.write("Wall time limit exceeded! time = %i\n" % time)
             else:
-                time = float(time)
-                sys.stdout.write("OK! time = %.2f\n" % time)
-        elif correct == None: # There is no solution
-            time = timeout * inc_to
-            sys.stdout.write("No solution found! time = %i\n" % time)
-        elif correct == False: # There is a bug in the solution
-            time = timeout * inc_bug
-            sys.stdout.write("Wrong solution! time = %i\n" % time)
-        total_time += time
-        sys.stdout.write("Current time = %.2f\n" % total_time)
-    # Remove temp files
-    os.system("rm %s" % out_file)
-    os.system("rm %s" % limits_file)
+                time = timeout * inc_to
+                sys.stdout.write("No solution found! time = %i\n" % time)
+            total_time += time
+            sys.stdout.write("Current time = %.2f\n" % total_time)
+        sys.stdout.write("Total time = %.2f\n" % total_time)
+        sys.exit()
+    db = open_store(args.store) if args.store else None
+    if args.racing:
+        # Hardest instances first, a solver that can not beat the best total stops as soon as possible
+        predicted = difficulty(benchmark_files, db)
+        benchmark_files.sort(key = lambda bf: predicted[bf], reverse = True)
+        batches = [[solver] for solver in solvers] # One solver at a time, against the best total so far
+    else:
+        batches = [solvers] # All the runs in the same pool
+    # Every run gets its own directory with its output file
+    work_dir = tempfile.mkdtemp(prefix = "race-")
+    times = {solver: {} for solver in solvers}
+    stopped = set()
+    best_time = None # Best total time of the solvers that ran all the instances
+    total_time = 0
+    results = None
+    # Run the solvers for al the instances
+    try:
+        for batch in batches:
+            run_list = [(solver, bf, seed) for solver in batch for bf in benchmark_files for seed in seeds]
+            job_list = [(os.path.join(work_dir, "%s-%i" % (os.path.basename(solver), i)), solver, bf, seed) for i, (solver, bf, seed) in enumerate(run_list)]
+            results = collect(job_list, jobs, db)
+            for solver in batch:
+                partial = 0
+                for bf in benchmark_files:
+                    run_times = []
+                    solved = 0
+                    for k, seed in enumerate(seeds):
+                        if race:
+                            sys.stdout.write("Solver %s, file %s" % (os.path.basename(solver), os.path.basename(bf)))
+                        else:
+                            sys.stdout.write("File %s" % os.path.basename(bf))
+                        if seed != None:
+                            sys.stdout.write(", seed %i" % seed)
+                        sys.stdout.write("... ")
+                        sys.stdout.flush()
+                        run = next(results)
+                        if verbose:
+                            with open(run.out_file, 'r') as output:
+                                sys.stdout.write('\n')
+                                for l in output.readlines():
+                                    sys.stdout.write(l)
+                        #Check result
+                        time, correct, message = score(bf, run)
+                        if args.curves:
+                            save_curve(args.curves, solver, bf, k if seed == None else seed, run.out_file)
+                        sys.stdout.write(message)
+                        run_times.append(time)
+                        solved += correct
+                    if runs > 1:
+                        time, message = summary(run_times, solved)
+                        sys.stdout.write("File %s: %s" % (os.path.basename(bf), message))
+                    times[solver][bf] = time
+                    partial += time
+                    if not race:
+                        total_time += time
+                        sys.stdout.write("Current time = %.2f\n" % total_time)
+                    if args.racing and best_time != None and partial > best_time:
+                        sys.stdout.write("Solver %s stopped! partial time = %.2f > best total time = %.2f\n" % (os.path.basename(solver), partial, best_time))
+                        stopped.add(solver)
+                        break
+                else:
+                    if best_time == None or partial < best_time:
+                        best_time = partial
+            results.close() # Cancels the runs of a stopped solver
+    finally:
+        if results:
+            results.close()
+        if db:
+            db.close()
+        # Remove temp files
+        shutil.rmtree(work_dir)
 
     # Results
-    sys.stdout.write("Total time = %.2f\n" % total_time)
+    if race:
+        show_leaderboard(solvers, benchmark_files, times, stopped)
+    else:
+        sys.stdout.write("Total time = %.2f\n" % total_time)
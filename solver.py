@@ -161,7 +161,7 @@ def transcriptSolution(result):
 
 # Main program
 if __name__ in "__main__":
-	random.seed()
+	random.seed(os.environ.get("SAT_SEED"))
 	if len(sys.argv) < 2:
 		print("ERROR: Atributs")
 		sys.exit(-1)
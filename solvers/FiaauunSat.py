@@ -10,6 +10,11 @@
 
 import random
 import sys
+import os
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir))
+import dimacs # shared DIMACS reader
 
 # -------------------------------- VARIABLES EXPLANATION --------------------------------
 # lit_clause: 
@@ -32,33 +37,17 @@ import sys
 #           1 -3 2 0                    2
 #           1 -2 3 0                    2
 #           2 -1 3 0                    2
+#
+# unsat, unsat_pos:
+#   type: lists (unsat: unsatisfied clauses, unsat_pos: length = number of clauses of the problem)
+#   description: unsat has the index of each clause with true_sat_lit = 0, in no particular order, and unsat_pos has the position
+#                of each clause in unsat (-1 if it is satisfied), so a clause is added or removed in constant time
 # ---------------------------------------------------------------------------------------
 
 def read_file(filename):
-    clauses = []
-    count = 0
-
-    for line in open(filename):
-        if line[0] == 'c':
-            # skip comment lines
-            continue
-        elif line[0] == 'p':
-            # save number of variables of the problem and create a list that stores the index numbers of clauses where the literal appears
-            num_vars = int(line.split()[2])
-            lit_clause = [[] for _ in range(num_vars * 2 + 1)]
-            continue
-        else:
-            # read clause and for each literal in the clause record the index of the clause in which it appears
-            clause = []
-            for lit in line[:-2].split():
-                lit = int(lit)
-                clause.append(lit)
-                lit_clause[lit].append(count)
-
-            clauses.append(clause)
-            count += 1
-
-    return clauses, num_vars, lit_clause
+    # read the problem with the shared reader, its occurrence index has the same layout as lit_clause
+    cnf = dimacs.load(filename)
+    return dimacs.clause_lists(cnf), cnf.num_vars, dimacs.occurrence_lists(cnf)
 
 
 def get_random_model(num_vars):
@@ -81,16 +70,39 @@ def get_true_sat_lit(clauses, model):
     return true_sat_lit
 
 
-def update_tsl(lit_to_flip, true_sat_lit, lit_clause):
+def get_unsat(true_sat_lit):
+    # index of the unsatisfied clauses and position of each clause in that list
+    unsat = []
+    unsat_pos = [-1] * len(true_sat_lit)
+    for index, true_lit in enumerate(true_sat_lit):
+        if not true_lit:
+            unsat_pos[index] = len(unsat)
+            unsat.append(index)
+    return unsat, unsat_pos
+
+
+def update_tsl(lit_to_flip, true_sat_lit, lit_clause, unsat, unsat_pos):
     # get index of clauses where the literal to flip appears
     # in true_sat_lit[index] increase by 1 
+    # a clause that gets its first true literal leaves unsat: the last clause of unsat takes its position
     for clause_index in lit_clause[lit_to_flip]:
         true_sat_lit[clause_index] += 1
+        if true_sat_lit[clause_index] == 1:
+            pos = unsat_pos[clause_index]
+            last = unsat.pop()
+            if last != clause_index:
+                unsat[pos] = last
+                unsat_pos[last] = pos
+            unsat_pos[clause_index] = -1
 
     # get index of clauses where the negated literal to flip appears
     # in true_sat_lit[index] decrease by 1 
+    # a clause left without true literals goes to the end of unsat
     for clause_index in lit_clause[-lit_to_flip]:
         true_sat_lit[clause_index] -= 1
+        if not true_sat_lit[clause_index]:
+            unsat_pos[clause_index] = len(unsat)
+            unsat.append(clause_index)
 
 
 def compute_broken(clause, true_sat_lit, lit_clause, p=0.4):
@@ -121,26 +133,52 @@ def compute_broken(clause, true_sat_lit, lit_clause, p=0.4):
     return random.choice(best_lits)
 
 
+def print_progress(flips, unsat, elapsed):
+    # progress line: flips done, unsatisfied clauses and CPU seconds
+    sys.stdout.write('c o %d %d %.3f\n' % (flips, unsat, elapsed))
+    sys.stdout.flush()
+
+
+def print_stats(flips, restarts, elapsed):
+    # search statistics: flips, flips per second and restarts
+    sys.stdout.write('c flips %d (%.0f flips/s), restarts %d\n' % (flips, flips / elapsed if elapsed else 0, restarts))
+
+
 def walksat(clauses, num_vars, lit_clause, flips_proportion=4):
     max_flips = num_vars * flips_proportion
 
+    # seconds between progress lines given by the race (0 = no progress lines)
+    progress = float(os.environ.get('SAT_PROGRESS', 0))
+    start = last_progress = time.process_time()
+    flips = 0
+    restarts = -1 # the first random model is not a restart
+
     while 1:
         model = get_random_model(num_vars)
+        restarts += 1
         
         true_sat_lit = get_true_sat_lit(clauses, model)
+        unsat_clauses_index, unsat_pos = get_unsat(true_sat_lit)
         
         for _ in range(max_flips):
-            unsat_clauses_index = [index for index, true_lit in enumerate(true_sat_lit) if not true_lit]
-
             if not unsat_clauses_index:
+                elapsed = time.process_time() - start
+                if progress:
+                    print_progress(flips, 0, elapsed)
+                print_stats(flips, restarts, elapsed)
                 return model
 
+            flips += 1
+            if progress and flips % 1000 == 0 and time.process_time() - last_progress >= progress:
+                last_progress = time.process_time()
+                print_progress(flips, len(unsat_clauses_index), last_progress - start)
+
             clause_index = random.choice(unsat_clauses_index)
             unsatisfied_clause = clauses[clause_index]
 
             lit_to_flip = compute_broken(unsatisfied_clause, true_sat_lit, lit_clause)
 
-            update_tsl(lit_to_flip, true_sat_lit, lit_clause)
+            update_tsl(lit_to_flip, true_sat_lit, lit_clause, unsat_clauses_index, unsat_pos)
 
             model[abs(lit_to_flip)] *= -1
 
@@ -150,6 +188,9 @@ def print_results(solution):
     print('v ' + ' '.join(map(str, solution[1:])) + ' 0')
 
 
-clauses, num_vars, lit_clause = read_file(sys.argv[1])
-solution = walksat(clauses, num_vars, lit_clause)
-print_results(solution)
\ No newline at end of file
+if __name__ == '__main__':
+    # use the seed given by the race, if any
+    random.seed(os.environ.get('SAT_SEED'))
+    clauses, num_vars, lit_clause = read_file(sys.argv[1])
+    solution = walksat(clauses, num_vars, lit_clause)
+    print_results(solution)
\ No newline at end of file
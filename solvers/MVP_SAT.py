@@ -5,6 +5,7 @@ Pau Escolà Barragan
 """
 
 import sys
+import os
 import random
 import time
 
@@ -193,8 +194,8 @@ if __name__=='__main__':
 
   input_cnf_formula = sys.argv[1]
 
-  #Set seed to actual time
-  random.seed(time.time()*1000)
+  #Set seed to the one given by the race or to actual time
+  random.seed(os.environ.get("SAT_SEED", time.time()*1000))
 
   #Read the input cnf formula
   problem = read_benchmark(input_cnf_formula)
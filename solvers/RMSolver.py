@@ -5,6 +5,11 @@ import random
 import time
 import os
 
+#Adaptive noise (Hoos): the random walk probability starts at 0, it rises when the number of
+#unsatisfied clauses has not improved for THETA*clauses flips and it falls on each improvement
+NOISE_PHI = 0.2
+NOISE_THETA = 1/6
+
 class RMSolver:
 	def __init__(self,variables,clause_len,literal_position,formula):
 		self.variables = variables
@@ -52,7 +57,7 @@ class RMSolver:
 
 		return unsat_clauses
 
-	def best_literal(self,clause,sat_literals):
+	def best_literal(self,clause,sat_literals,noise):
 		best_literal = []
 		min_value = 999999
 
@@ -70,7 +75,7 @@ class RMSolver:
 				best_literal.clear()
 				best_literal.append(lit)
 
-		if random.random() > 0.65 and min_value>0: best_literal = clause
+		if random.random() < noise and min_value>0: best_literal = clause
 		return random.choice(best_literal)
 
 	def update(self,lit,interpretation,sat_literals):
@@ -82,23 +87,57 @@ class RMSolver:
 
 		interpretation[abs(lit)]*=-1
 
+	def print_progress(self,flips,unsat,elapsed):
+		#Progress line: flips done, unsatisfied clauses and CPU seconds
+		sys.stdout.write("c o %d %d %.3f\n" % (flips,unsat,elapsed))
+		sys.stdout.flush()
+
+	def adapt_noise(self,noise,improved):
+		#Lower the noise after an improvement, raise it after a stagnation
+		if improved: return noise - noise*NOISE_PHI/2
+		return noise + (1-noise)*NOISE_PHI
+
 	def solve(self):
-		max_flips = int(self.variables)*4
+		#A single walk from a random interpretation, the adaptive noise takes it out of
+		#the stagnations instead of the restarts every 4*variables flips
+		stagnation = max(1, int(NOISE_THETA*len(self.formula)))
+		#Seconds between progress lines given by the race (0 = no progress lines)
+		progress = float(os.environ.get('SAT_PROGRESS', 0))
+		start = last_progress = time.process_time()
+		flips = 0
 		
+		interpretation = self.get_initial_interpretation()
+		sat_literals = self.get_sat_literals(interpretation)
+		noise = 0
+		last_adapt = 0 #Flips at the last noise change
+		adapt_unsat = len(self.formula) + 1 #Unsatisfied clauses at the last noise change
+
 		while True:
-			interpretation = self.get_initial_interpretation()
-			sat_literals = self.get_sat_literals(interpretation)
-
-			for i in range(max_flips):
-				unsat_clauses = self.get_unsat_clauses(sat_literals)
-				
-				if not unsat_clauses: 
-					return interpretation
-				
-				unsat_clause = self.formula[random.choice(unsat_clauses)]
-				bestLiteral = self.best_literal(unsat_clause,sat_literals) 	
+			unsat_clauses = self.get_unsat_clauses(sat_literals)
+			
+			if not unsat_clauses: 
+				if progress: self.print_progress(flips,0,time.process_time()-start)
+				sys.stdout.write("c flips %d, noise %.3f\n" % (flips,noise))
+				return interpretation
+
+			if len(unsat_clauses) < adapt_unsat:
+				noise = self.adapt_noise(noise,True)
+				last_adapt = flips
+				adapt_unsat = len(unsat_clauses)
+			elif flips - last_adapt > stagnation:
+				noise = self.adapt_noise(noise,False)
+				last_adapt = flips
+				adapt_unsat = len(unsat_clauses)
+
+			flips += 1
+			if progress and flips % 1000 == 0 and time.process_time()-last_progress >= progress:
+				last_progress = time.process_time()
+				self.print_progress(flips,len(unsat_clauses),last_progress-start)
 			
-				self.update(bestLiteral,interpretation,sat_literals)
+			unsat_clause = self.formula[random.choice(unsat_clauses)]
+			bestLiteral = self.best_literal(unsat_clause,sat_literals,noise) 	
+		
+			self.update(bestLiteral,interpretation,sat_literals)
 
 
 def generateSolver(file):
@@ -150,6 +189,7 @@ if __name__ == "__main__":
 	if not formula.endswith('.cnf'):
 		sys.exit("ERROR: input_cnf_formula must end with .cnf")
 
+	random.seed(os.environ.get('SAT_SEED')) #Seed given by the race, if any
 	Solver = generateSolver(open(formula, 'r'))
 	result = Solver.solve()
 	print_results(result)
\ No newline at end of file
@@ -5,6 +5,16 @@ import random
 import time
 import os
 
+# Clause weighting (weighted_solver): 'paws' or 'saps', 'none' for the plain walksat.
+# The environment variable RACESATWINNER_WEIGHTING overrides it.
+WEIGHTING = 'paws'
+PAWS_MAX_INC = 10  # PAWS: weight increases between two decreases of every weight above 1
+SAPS_ALPHA = 1.3  # SAPS: scaling of the weights of the unsat clauses at a local minimum
+SAPS_RHO = 0.8  # SAPS: weights kept when smoothing, the rest moves to the mean weight
+SAPS_SMOOTH = 0.05  # SAPS: probability of smoothing after a scaling
+SAPS_WALK = 0.01  # SAPS: probability of a random walk step at a local minimum
+SAPS_EPSILON = 1e-9  # SAPS: smallest score taken as an improvement, below it is rounding error
+
 
 class raceSatWinner:
     def getFormula(file):
@@ -91,8 +101,12 @@ class raceSatWinner:
             sat_literals[lit] -= 1
         interpretation[abs(literal)] *= -1
 
-    def solver(self):
+    def solver(self, weighting=None):
 
+        if weighting is None:
+            weighting = os.environ.get('RACESATWINNER_WEIGHTING', WEIGHTING)
+        if weighting != 'none':
+            return self.weighted_solver(weighting)
         max = int(self.var) * 4
         while True:
             interpretation = self.interpretate_all()
@@ -106,6 +120,140 @@ class raceSatWinner:
                 self.update_all(best_literal, interpretation, sat_literals)
 
 
+    def weighted_solver(self, scheme):
+
+        # Dynamic local search with clause weights (PAWS or SAPS), no restarts.
+        # score[v]: weight of the unsat clauses a flip of v satisfies (make) minus the weight of the
+        # clauses it breaks, the ones where v has the only true literal. Every flip updates it
+        # incrementally and the variables with a positive score (above threshold) are kept in good.
+        # The greedy step flips the best of them. At a local minimum (no good variable) the weights of
+        # the unsat clauses grow: +1 for PAWS, times SAPS_ALPHA for SAPS, and a smoothing brings
+        # the weights back together: every PAWS_MAX_INC increases for PAWS, with probability SAPS_SMOOTH for SAPS.
+        if scheme not in ('paws', 'saps'):
+            sys.exit("ERROR: unknown clause weighting %s (paws, saps or none)." % scheme)
+        n = int(self.var)
+        clauses = []  # without repeated literals, the tautologies are always satisfied
+        for clause in self.f:
+            clause = list(dict.fromkeys(clause))
+            if not any(-literal in clause for literal in clause):
+                clauses.append(clause)
+        position = [[] for _ in range(2 * n + 1)]
+        for index, clause in enumerate(clauses):
+            for literal in clause:
+                position[literal].append(index)
+
+        interpretation = self.interpretate_all()
+        weight = [1 if scheme == 'paws' else 1.0 for _ in clauses]
+        true_count = [0 for _ in clauses]
+        true_vars = [0 for _ in clauses]  # xor of the true variables, the critical one when there is one
+        unsat, unsat_pos = [], [-1 for _ in clauses]
+        for index, clause in enumerate(clauses):
+            for literal in clause:
+                if interpretation[abs(literal)] == literal:
+                    true_count[index] += 1
+                    true_vars[index] ^= abs(literal)
+            if not true_count[index]:
+                unsat_pos[index] = len(unsat)
+                unsat.append(index)
+        good, good_pos = [], [-1 for _ in range(n + 1)]
+        threshold = 0 if scheme == 'paws' else SAPS_EPSILON
+
+        def compute_scores():
+            score = [0 for _ in range(n + 1)]
+            for index, clause in enumerate(clauses):
+                if not true_count[index]:
+                    for literal in clause:
+                        score[abs(literal)] += weight[index]
+                elif true_count[index] == 1:
+                    score[true_vars[index]] -= weight[index]
+            return score
+
+        def sync(variables):
+            # keep good equal to the variables with a positive score
+            for v in variables:
+                if score[v] > threshold:
+                    if good_pos[v] < 0:
+                        good_pos[v] = len(good)
+                        good.append(v)
+                elif good_pos[v] >= 0:
+                    last = good.pop()
+                    if last != v:
+                        good[good_pos[v]] = last
+                        good_pos[last] = good_pos[v]
+                    good_pos[v] = -1
+
+        def flip(v):
+            literal = -interpretation[v]  # becomes true
+            interpretation[v] = literal
+            changed = [v]
+            for index in position[literal]:
+                w = weight[index]
+                true_count[index] += 1
+                if true_count[index] == 1:  # satisfied: no more make, v breaks it
+                    for other in clauses[index]:
+                        score[abs(other)] -= w
+                        changed.append(abs(other))
+                    score[v] -= w
+                    last = unsat.pop()
+                    if last != index:
+                        unsat[unsat_pos[index]] = last
+                        unsat_pos[last] = unsat_pos[index]
+                    unsat_pos[index] = -1
+                elif true_count[index] == 2:  # the critical variable no longer breaks it
+                    score[true_vars[index]] += w
+                    changed.append(true_vars[index])
+                true_vars[index] ^= v
+            for index in position[-literal]:
+                w = weight[index]
+                true_count[index] -= 1
+                true_vars[index] ^= v
+                if not true_count[index]:  # unsatisfied: v no longer breaks it, every variable makes it
+                    score[v] += w
+                    for other in clauses[index]:
+                        score[abs(other)] += w
+                        changed.append(abs(other))
+                    unsat_pos[index] = len(unsat)
+                    unsat.append(index)
+                elif true_count[index] == 1:  # the variable left breaks it
+                    score[true_vars[index]] -= w
+                    changed.append(true_vars[index])
+            sync(changed)
+
+        score = compute_scores()
+        sync(range(1, n + 1))
+        increases = 0
+        while unsat:
+            if good:
+                best_score = max(score[v] for v in good)
+                flip(random.choice([v for v in good if score[v] == best_score]))
+                continue
+            # local minimum
+            if scheme == 'saps' and random.random() < SAPS_WALK:
+                flip(abs(random.choice(clauses[random.choice(unsat)])))
+                continue
+            changed = []
+            for index in unsat:
+                increase = 1 if scheme == 'paws' else weight[index] * (SAPS_ALPHA - 1)
+                weight[index] += increase
+                for literal in clauses[index]:
+                    score[abs(literal)] += increase
+                    changed.append(abs(literal))
+            sync(changed)
+            increases += 1
+            if scheme == 'paws' and increases % PAWS_MAX_INC == 0:
+                for index in range(len(clauses)):
+                    if weight[index] > 1:
+                        weight[index] -= 1
+                score = compute_scores()
+                sync(range(1, n + 1))
+            elif scheme == 'saps' and random.random() < SAPS_SMOOTH:
+                mean = sum(weight) / len(weight)
+                weight = [SAPS_RHO * w + (1 - SAPS_RHO) * mean for w in weight]
+                score = compute_scores()
+                sync(range(1, n + 1))
+        return interpretation
+
+
 def makeOutput(interpretation):
     out = 's SATISFIABLE \n'
     out += 'v '
@@ -133,6 +281,7 @@ if __name__ == "__main__":
     if path[-4:] != '.cnf':
         sys.exit("ERROR: input_cnf_formula must be ended with .cnf")
 
+    random.seed(os.environ.get('SAT_SEED'))  # Seed given by the race, if any.
     cnf = raceSatWinner.getFormula(open(path, 'r'))
     interpretation = cnf.solver()
     makeOutput(interpretation)
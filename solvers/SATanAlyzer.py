@@ -215,8 +215,8 @@ if __name__ == '__main__':
     else:
         sys.exit("ERROR: Argument must be a file (if possible cnf file) (%s)." % sys.argv[1])
 
-    # Initialize random seed (current time)
-    random.seed(None)
+    # Initialize random seed (the one given by the race or current time)
+    random.seed(os.environ.get("SAT_SEED"))
 
     # proves
     # formula = CNF(benchmark_file)
@@ -0,0 +1,428 @@
+#!/usr/bin/python3
+# -*- coding: utf-8 -*-
+
+"""
+    ------------------------- CDCL -------------------------
+
+    Complete solver based on conflict-driven clause learning: it finds
+    a model or proves that there is none (s UNSATISFIABLE).
+
+    Two watched literals propagation, first UIP learning with local
+    minimization of the learned clause, VSIDS decisions with phase saving,
+    Luby restarts and deletion of the learned clauses with the highest LBD.
+
+    Hooks for other solvers running alongside:
+        phase: saved phase of each variable (True = positive), it may be
+               overwritten between restarts
+        on_restart(solver): called at level 0 before each restart, it may
+               fix literals with add_unit
+        on_fixed(lit): called with each literal fixed at level 0
+
+    With a proof file (second argument or SAT_PROOF variable) the learned
+    clauses and the deletions are written as a binary DRAT proof, which
+    drat.py checks.
+
+"""
+import sys
+import os
+import heapq
+import random
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir))
+import dimacs  # shared DIMACS reader
+
+RESTART_BASE = 100  # conflicts of a restart, times the Luby sequence
+VAR_DECAY = 0.95
+CLAUSE_DECAY = 0.999
+REDUCE_BASE = 2000  # conflicts before the first learned clause deletion
+REDUCE_INC = 300  # each deletion waits this many conflicts more than the previous one
+KEEP_LBD = 2  # learned clauses with this LBD or less are never deleted
+PROOF_BUFFER = 1 << 16  # bytes of proof kept before each write
+
+
+def luby(i):
+    """i-th element (from 1) of the Luby sequence 1 1 2 1 1 2 4 1 1 2 1 1 2 4 8 ..."""
+    k = 1
+    while (1 << k) - 1 < i:
+        k += 1
+    while (1 << k) - 1 != i:
+        i -= (1 << (k - 1)) - 1
+        k = 1
+        while (1 << k) - 1 < i:
+            k += 1
+    return 1 << (k - 1)
+
+
+class Solver:
+    """CDCL solver state.
+       Literals are the DIMACS integers, the lists indexed by literal have
+       2 * num_vars + 1 positions so that negative literals index from the end.
+       clauses: all the clauses, None where a learned clause was deleted;
+                the two first literals of a clause are watched and the first
+                literal of a reason clause is the literal it implied
+       watches: clauses watching each literal, visited when the literal gets false
+       value: 1 true, -1 false, 0 unassigned, by literal
+    """
+
+    def __init__(self, num_vars, proof=None):
+        self.num_vars = num_vars
+        self.proof = proof  # binary file for the DRAT proof, or None
+        self.proof_buffer = bytearray()
+        self.clauses = []
+        self.learnts = []
+        self.lbd = []
+        self.clause_activity = []
+        self.cla_inc = 1.0
+        self.watches = [[] for _ in range(2 * num_vars + 1)]
+        self.value = [0] * (2 * num_vars + 1)
+        self.level = [0] * (num_vars + 1)
+        self.reason = [None] * (num_vars + 1)
+        self.trail = []
+        self.trail_lim = []
+        self.qhead = 0
+        # tiny random activities break the ties of the first decisions
+        self.activity = [random.random() * 1e-5 for _ in range(num_vars + 1)]
+        self.var_inc = 1.0
+        self.heap = []
+        self.rebuild_heap()
+        self.phase = [False] * (num_vars + 1)
+        self.seen = [False] * (num_vars + 1)
+        self.unsat = False
+        self.conflicts = 0
+        self.decisions = 0
+        self.propagations = 0
+        self.on_restart = None
+        self.on_fixed = None
+
+    def add_clause(self, lits):
+        """Adds a clause of the formula, before the search."""
+        lits = list(dict.fromkeys(lits))
+        if self.unsat or any(-lit in lits for lit in lits):  # tautology
+            return
+        if any(self.value[lit] == 1 for lit in lits):  # satisfied at level 0
+            return
+        if any(self.value[lit] == -1 for lit in lits):  # false at level 0
+            lits = [lit for lit in lits if self.value[lit] == 0]
+            self.log(lits)
+        if not lits:
+            self.unsat = True
+        elif len(lits) == 1:
+            self.add_unit(lits[0])
+        else:
+            self.attach(lits, False)
+
+    def add_unit(self, lit):
+        """Fixes a literal at level 0 (before the search or from on_restart)."""
+        if self.value[lit] == -1:
+            self.unsat = True
+        elif self.value[lit] == 0:
+            self.enqueue(lit, None)
+            if self.propagate() is not None:
+                self.unsat = True
+
+    def log(self, lits, deletion=False):
+        """Writes an added (or deleted) clause to the DRAT proof, in the binary format."""
+        if self.proof is None:
+            return
+        buffer = self.proof_buffer
+        buffer.append(0x64 if deletion else 0x61)
+        for lit in lits:
+            code = 2 * lit if lit > 0 else 1 - 2 * lit
+            while code > 0x7f:
+                buffer.append(code & 0x7f | 0x80)
+                code >>= 7
+            buffer.append(code)
+        buffer.append(0)
+        if len(buffer) > PROOF_BUFFER:
+            self.proof.write(buffer)
+            buffer.clear()
+
+    def flush_proof(self):
+        """Writes the proof kept in the buffer."""
+        if self.proof is not None:
+            self.proof.write(self.proof_buffer)
+            self.proof_buffer.clear()
+            self.proof.flush()
+
+    def attach(self, lits, learnt, lbd=0):
+        """Stores a clause and watches its two first literals, returns its index."""
+        idx = len(self.clauses)
+        self.clauses.append(lits)
+        self.lbd.append(lbd)
+        self.clause_activity.append(0.0)
+        self.watches[lits[0]].append(idx)
+        self.watches[lits[1]].append(idx)
+        if learnt:
+            self.learnts.append(idx)
+        return idx
+
+    def enqueue(self, lit, reason):
+        """Makes a literal true at the current level."""
+        self.value[lit] = 1
+        self.value[-lit] = -1
+        var = abs(lit)
+        self.level[var] = len(self.trail_lim)
+        self.reason[var] = reason
+        self.trail.append(lit)
+        if not self.trail_lim and self.on_fixed:
+            self.on_fixed(lit)
+
+    def propagate(self):
+        """Unit propagation of the trail, returns the index of a conflicting clause or None."""
+        value = self.value
+        clauses = self.clauses
+        watches = self.watches
+        trail = self.trail
+        while self.qhead < len(trail):
+            false_lit = -trail[self.qhead]
+            self.qhead += 1
+            self.propagations += 1
+            watch_list = watches[false_lit]
+            watches[false_lit] = kept = []
+            for k, idx in enumerate(watch_list):
+                clause = clauses[idx]
+                if clause is None:  # deleted learned clause
+                    continue
+                if clause[0] == false_lit:
+                    clause[0] = clause[1]
+                    clause[1] = false_lit
+                first = clause[0]
+                if value[first] == 1:
+                    kept.append(idx)
+                    continue
+                for m in range(2, len(clause)):
+                    lit = clause[m]
+                    if value[lit] != -1:  # new watch
+                        clause[1] = lit
+                        clause[m] = false_lit
+                        watches[lit].append(idx)
+                        break
+                else:
+                    kept.append(idx)
+                    if value[first] == -1:
+                        kept.extend(watch_list[k + 1:])
+                        return idx
+                    self.enqueue(first, idx)
+        return None
+
+    def bump_var(self, var):
+        """VSIDS: increases the activity of a variable of a conflict."""
+        self.activity[var] += self.var_inc
+        if self.activity[var] > 1e100:
+            for v in range(1, self.num_vars + 1):
+                self.activity[v] *= 1e-100
+            self.var_inc *= 1e-100
+            self.rebuild_heap()
+        elif self.value[var] == 0:
+            heapq.heappush(self.heap, (-self.activity[var], var))
+
+    def bump_clause(self, idx):
+        """Increases the activity of a learned clause used in a conflict."""
+        self.clause_activity[idx] += self.cla_inc
+        if self.clause_activity[idx] > 1e20:
+            for learnt in self.learnts:
+                self.clause_activity[learnt] *= 1e-20
+            self.cla_inc *= 1e-20
+
+    def rebuild_heap(self):
+        """Decision heap with an entry for each unassigned variable.
+           Entries are (-activity, var), the stale ones are skipped when popped."""
+        self.heap = [(-self.activity[v], v) for v in range(1, self.num_vars + 1) if self.value[v] == 0]
+        heapq.heapify(self.heap)
+
+    def analyze(self, confl):
+        """First UIP conflict analysis.
+           Returns the learned clause (asserting literal first, a literal of the
+           backjump level second), the backjump level and the LBD."""
+        seen = self.seen
+        level = self.level
+        current = len(self.trail_lim)
+        learnt = [0]
+        counter = 0
+        lit = None
+        idx = len(self.trail) - 1
+        while True:
+            clause = self.clauses[confl]
+            if self.lbd[confl]:
+                self.bump_clause(confl)
+            for q in (clause if lit is None else clause[1:]):
+                var = abs(q)
+                if not seen[var] and level[var] > 0:
+                    seen[var] = True
+                    self.bump_var(var)
+                    if level[var] == current:
+                        counter += 1
+                    else:
+                        learnt.append(q)
+            while not seen[abs(self.trail[idx])]:
+                idx -= 1
+            lit = self.trail[idx]
+            idx -= 1
+            seen[abs(lit)] = False
+            counter -= 1
+            if counter == 0:
+                break
+            confl = self.reason[abs(lit)]
+        learnt[0] = -lit
+        # local minimization: drop the literals implied by other literals of the clause
+        kept = [learnt[0]]
+        for q in learnt[1:]:
+            reason = self.reason[abs(q)]
+            if reason is None or not all(seen[abs(r)] or level[abs(r)] == 0 for r in self.clauses[reason][1:]):
+                kept.append(q)
+        for q in learnt[1:]:
+            seen[abs(q)] = False
+        learnt = kept
+        if len(learnt) == 1:
+            return learnt, 0, 1
+        best = max(range(1, len(learnt)), key=lambda i: level[abs(learnt[i])])
+        learnt[1], learnt[best] = learnt[best], learnt[1]
+        lbd = len(set(level[abs(q)] for q in learnt))
+        return learnt, level[abs(learnt[1])], lbd
+
+    def backtrack(self, target):
+        """Unassigns the literals above a level, saving their phases."""
+        if len(self.trail_lim) <= target:
+            return
+        start = self.trail_lim[target]
+        for lit in self.trail[start:]:
+            var = abs(lit)
+            self.value[lit] = 0
+            self.value[-lit] = 0
+            self.reason[var] = None
+            self.phase[var] = lit > 0
+            heapq.heappush(self.heap, (-self.activity[var], var))
+        del self.trail[start:]
+        del self.trail_lim[target:]
+        self.qhead = len(self.trail)
+        if len(self.heap) > 4 * self.num_vars + 1000:
+            self.rebuild_heap()
+
+    def pick_branch_var(self):
+        """Unassigned variable with the highest activity, None if all are assigned."""
+        heap = self.heap
+        while heap:
+            act, var = heapq.heappop(heap)
+            if self.value[var] == 0 and -act == self.activity[var]:
+                return var
+        return None
+
+    def locked(self, idx):
+        """Tells if a clause is the reason of its first literal."""
+        first = self.clauses[idx][0]
+        return self.value[first] == 1 and self.reason[abs(first)] == idx
+
+    def reduce_db(self):
+        """Deletes half of the learned clauses, those with the highest LBD and lowest activity."""
+        candidates = [idx for idx in self.learnts if self.lbd[idx] > KEEP_LBD and not self.locked(idx)]
+        candidates.sort(key=lambda idx: (-self.lbd[idx], self.clause_activity[idx]))
+        deleted = set(candidates[:len(candidates) // 2])
+        for idx in deleted:
+            self.log(self.clauses[idx], True)
+            self.clauses[idx] = None  # the watches are dropped by propagate
+        self.learnts = [idx for idx in self.learnts if idx not in deleted]
+
+    def search(self, max_conflicts):
+        """Searches until a model, a refutation or a restart.
+           Returns True (model), False (unsatisfiable) or None (restart)."""
+        conflicts = 0
+        while True:
+            confl = self.propagate()
+            if confl is not None:
+                self.conflicts += 1
+                conflicts += 1
+                if not self.trail_lim:
+                    return False
+                learnt, target, lbd = self.analyze(confl)
+                self.log(learnt)
+                self.backtrack(target)
+                if len(learnt) == 1:
+                    self.enqueue(learnt[0], None)
+                else:
+                    self.enqueue(learnt[0], self.attach(learnt, True, lbd))
+                self.var_inc /= VAR_DECAY
+                self.cla_inc /= CLAUSE_DECAY
+            else:
+                if conflicts >= max_conflicts:
+                    self.backtrack(0)
+                    return None
+                if self.conflicts >= self.next_reduce:
+                    self.reductions += 1
+                    self.next_reduce = self.conflicts + REDUCE_BASE + REDUCE_INC * self.reductions
+                    self.reduce_db()
+                var = self.pick_branch_var()
+                if var is None:
+                    return True
+                self.decisions += 1
+                self.trail_lim.append(len(self.trail))
+                self.enqueue(var if self.phase[var] else -var, None)
+
+    def solve(self):
+        """Returns a model (list of literals) or None if the formula is unsatisfiable."""
+        self.reductions = 0
+        self.next_reduce = REDUCE_BASE
+        restarts = 0
+        while not self.unsat:
+            if self.propagate() is not None:
+                self.unsat = True
+                break
+            restarts += 1
+            status = self.search(luby(restarts) * RESTART_BASE)
+            if status is True:
+                self.flush_proof()
+                return [var if self.value[var] == 1 else -var for var in range(1, self.num_vars + 1)]
+            if status is False:
+                self.unsat = True
+            elif self.on_restart:
+                self.on_restart(self)
+        self.log([])  # the empty clause ends the refutation
+        self.flush_proof()
+        return None
+
+
+def read_formula(cnf_path, proof=None):
+    """Reads a cnf file into a solver, proof is the binary file for the DRAT proof."""
+    cnf = dimacs.load(cnf_path)
+    solver = Solver(cnf.num_vars, proof)
+    seen = set()
+    for clause in dimacs.clause_lists(cnf):
+        key = frozenset(clause)
+        if key not in seen:  # skip repeated clauses
+            seen.add(key)
+            solver.add_clause(clause)
+    return solver
+
+
+def print_solution(solver, solution):
+    """Prints the search statistics and the result in the competition format."""
+    sys.stdout.write("c %s\n" % sys.argv[0][:-3])
+    sys.stdout.write("c conflicts %d decisions %d propagations %d\n" % (
+        solver.conflicts, solver.decisions, solver.propagations))
+    if solution is not None:
+        sys.stdout.write("s SATISFIABLE\n")
+        sys.stdout.write("v %s 0\n" % " ".join(str(lit) for lit in solution))
+    else:
+        sys.stdout.write("s UNSATISFIABLE\n")
+
+
+def main():
+    """parses arguments, runs the CDCL solver and prints the result"""
+    if len(sys.argv) not in (2, 3):
+        sys.stderr.write("ERROR: Incorrect number of arguments. Given %s. Expected 2 or 3.\n" %
+                         len(sys.argv))
+        sys.exit("Use: %s CNF_file [DRAT_proof_file]" % sys.argv[0])
+    cnf_path = sys.argv[1]
+    if not os.path.isfile(cnf_path):
+        sys.exit("ERROR: CNF file %s does not exist." % cnf_path)
+    proof_path = sys.argv[2] if len(sys.argv) == 3 else os.environ.get("SAT_PROOF")  # proof asked by the race
+
+    random.seed(os.environ.get("SAT_SEED"))  # seed given by the race, if any
+    proof = open(proof_path, "wb") if proof_path else None
+    solver = read_formula(cnf_path, proof)
+    print_solution(solver, solver.solve())
+    if proof:
+        proof.close()
+
+
+if __name__ == "__main__":
+    main()
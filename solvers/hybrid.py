@@ -0,0 +1,136 @@
+#!/usr/bin/python3
+# -*- coding: utf-8 -*-
+
+"""
+    ------------------------- Hybrid -------------------------
+
+    Runs the reallySAT local search and the CDCL solver at the same time,
+    each in its own process, and reports the first answer: a model from
+    either of them or a refutation from CDCL.
+
+    They share two arrays in shared memory:
+        phases: best interpretation of the local search (fewest unsatisfied
+                clauses so far), CDCL copies it into its saved phases at
+                each restart
+        units:  literals CDCL fixes at level 0, the local search makes them
+                true and never flips them again
+
+"""
+import sys
+import os
+import random
+import multiprocessing
+import multiprocessing.connection
+
+import reallysat
+import cdcl
+
+
+def walker(clauses, num_vars, num_clauses, phases, units, num_units, conn):
+    """Local search process: sends the model found, if any."""
+    best = [num_clauses + 1]
+    read = [0]
+
+    def exchange(interpretation, unsat):
+        if unsat < best[0]:
+            best[0] = unsat
+            phases[1:] = interpretation
+        count = num_units.value
+        new_lits = units[read[0]:count]
+        read[0] = count
+        return new_lits
+
+    solution = reallysat.solve(clauses, num_vars, num_clauses, exchange)
+    if solution is not None:  # the refutations come from CDCL, with their proof
+        conn.send(("reallysat", solution))
+
+
+def systematic(cnf_path, proof_path, phases, units, num_units, conn):
+    """CDCL process: sends the model found or None for a refutation."""
+    proof = open(proof_path, "wb") if proof_path else None
+    solver = cdcl.read_formula(cnf_path, proof)
+
+    def on_restart(solver):
+        for var, lit in enumerate(phases[1:], 1):
+            if lit:
+                solver.phase[var] = lit > 0
+
+    def on_fixed(lit):
+        units[num_units.value] = lit
+        num_units.value += 1
+
+    solver.on_restart = on_restart
+    solver.on_fixed = on_fixed
+    for lit in solver.trail:  # fixed while reading the formula
+        on_fixed(lit)
+    solution = solver.solve()
+    if proof:
+        proof.close()
+    conn.send(("cdcl", solution))
+
+
+def run_hybrid(cnf_path, proof_path=None):
+    """Runs both solvers until one of them answers.
+       Returns the name of the solver and its answer (model, or None if the
+       formula is unsatisfiable), or (None, None) if both failed."""
+    clauses, num_vars, num_clauses = reallysat.get_cnf(cnf_path)
+    context = multiprocessing.get_context("fork")
+    # shared arrays, written by a single process each: no locks
+    phases = context.RawArray("i", num_vars + 1)
+    units = context.RawArray("i", num_vars)
+    num_units = context.RawValue("i", 0)
+    receiver, sender = context.Pipe(duplex=False)
+    seed = random.random()
+    processes = [
+        context.Process(target=walker, args=(clauses, num_vars, num_clauses, phases, units, num_units, sender)),
+        context.Process(target=systematic, args=(cnf_path, proof_path, phases, units, num_units, sender))]
+    for idx, process in enumerate(processes):
+        random.seed(seed + idx)  # each process gets its own random sequence
+        process.start()
+    sender.close()
+    waiting = [receiver] + [process.sentinel for process in processes]
+    answer = (None, None)
+    while len(waiting) > 1:
+        ready = multiprocessing.connection.wait(waiting)
+        if receiver in ready:
+            answer = receiver.recv()
+            break
+        for sentinel in ready:  # a process ended without an answer
+            waiting.remove(sentinel)
+    for process in processes:  # the race counts the CPU time of both
+        process.kill()
+        process.join()
+    return answer
+
+
+def print_solution(winner, solution):
+    """Prints the result in the competition format."""
+    sys.stdout.write("c %s\n" % sys.argv[0][:-3])
+    if winner is None:
+        sys.stdout.write("s UNKNOWN\n")
+        return
+    sys.stdout.write("c answer by %s\n" % winner)
+    if solution is not None:
+        sys.stdout.write("s SATISFIABLE\n")
+        sys.stdout.write("v %s 0\n" % " ".join(str(lit) for lit in solution))
+    else:
+        sys.stdout.write("s UNSATISFIABLE\n")
+
+
+def main():
+    """parses arguments, runs the hybrid solver and prints the result"""
+    if len(sys.argv) not in (2, 3):
+        sys.stderr.write("ERROR: Incorrect number of arguments. Given %s. Expected 2 or 3.\n" %
+                         len(sys.argv))
+        sys.exit("Use: %s CNF_file [DRAT_proof_file]" % sys.argv[0])
+    cnf_path = sys.argv[1]
+    if not os.path.isfile(cnf_path):
+        sys.exit("ERROR: CNF file %s does not exist." % cnf_path)
+    proof_path = sys.argv[2] if len(sys.argv) == 3 else os.environ.get("SAT_PROOF")  # proof asked by the race
+
+    random.seed(os.environ.get("SAT_SEED"))  # seed given by the race, if any
+    print_solution(*run_hybrid(cnf_path, proof_path))
+
+
+if __name__ == "__main__":
+    main()
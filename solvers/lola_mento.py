@@ -8,29 +8,16 @@ import stat
 import subprocess
 import random
 
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir))
+import dimacs  # lector DIMACS compartit
+
 MAX = 999999999999
 
 
-def prepare(clauses):
-    prepared_clauses = []
-    num = 0
-    for clause in clauses:
-        if(clause[0] == "c"):
-            pass
-        elif(clause[0] == "p"):
-            sep_cla = clause.split(" ")
-            num_vars = int(sep_cla[2])
-            all_vars = []
-            for _ in range(int(num_vars) * 2 + 1):
-                all_vars.append([])
-        else:
-            temp_clause = []
-            for var in clause[:-2].split():
-                temp_clause.append(int(var))
-                all_vars[int(var)].append(num)
-            prepared_clauses.append(temp_clause)
-            num = num + 1
-    return prepared_clauses, all_vars, num_vars
+def prepare(cnf_path):
+    # all_vars: clausules de cada literal, index de dimacs (mateixa posicio que abans)
+    cnf = dimacs.load(cnf_path)
+    return dimacs.clause_lists(cnf), dimacs.occurrence_lists(cnf), cnf.num_vars
 
 
 def initialAssignations(num_vars, clauses):
@@ -134,5 +121,6 @@ def solve(clauses, all_vars, num_vars, maxTries, maxFlips):
 
 
 if __name__ == '__main__':
-    clauses_prepared, all_vars, num_vars = prepare(open(sys.argv[1], "r"))
+    random.seed(os.environ.get("SAT_SEED"))  # llavor de la cursa, si n'hi ha
+    clauses_prepared, all_vars, num_vars = prepare(sys.argv[1])
     solve(clauses_prepared, all_vars, num_vars, 5, 5)
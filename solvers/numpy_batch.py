@@ -0,0 +1,215 @@
+#!/usr/bin/python3
+# -*- coding: utf-8 -*-
+
+"""
+    ------------------------- NumPy batched WalkSAT -------------------------
+
+    K independent WalkSAT walkers advanced in lock-step, one flip each per
+    step, instead of K restarts run one after another.
+
+    The state of the batch is a set of 2-D arrays:
+        value[k, var]: 1 if the variable is true in walker k
+        true_count[k, c]: true literals of clause c in walker k
+        unsat[k, :num_unsat[k]]: unsatisfied clauses of walker k
+        unsat_pos[k, c]: position of clause c in unsat[k], -1 if satisfied
+    A step picks a random unsatisfied clause in every walker, gathers the
+    break scores of all their literals at once (the occurrence ranges of
+    the negated literals, with walker k reading row k of true_count) and
+    flips the chosen literal of every walker with a single np.add.at on
+    the flattened counts. Only the clauses touched by the flips are checked
+    to update the unsatisfied lists. The first walker without unsatisfied clauses
+    gives the model. All the walkers restart together every
+    FLIPS_PROPORTION * num_vars steps.
+
+"""
+import sys
+import os
+import random
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from numpy_walksat import load_formula, print_progress, print_solution, NOISE, FLIPS_PROPORTION, ONE, MINUS_ONE
+
+WALKERS = 128  # assignments advanced together
+# cap of walkers * literals of the formula: the batch keeps walkers x clauses int32 arrays and
+# restart() builds walkers x literals temporaries, so big formulas get fewer walkers
+MAX_CELLS = 1 << 22
+
+
+def ranges(starts, lengths):
+    """Concatenated ranges [starts[i], starts[i] + lengths[i]).
+       Returns the number of the range and the position of each element."""
+    segment = np.repeat(np.arange(len(lengths)), lengths)
+    first = np.cumsum(lengths) - lengths
+    positions = np.arange(int(lengths.sum())) + np.repeat(starts - first, lengths)
+    return segment, positions
+
+
+class Batch:
+    """Search state of WALKERS assignments (see the module docstring)."""
+
+    def __init__(self, formula, rng, walkers):
+        self.formula = formula
+        self.rng = rng
+        self.walkers = walkers
+        self.rows = np.arange(walkers)
+        self.value = np.empty((walkers, formula.num_vars + 1), dtype=np.int8)
+        self.true_count = np.empty((walkers, formula.num_clauses), dtype=np.int32)
+        self.counts = self.true_count.ravel()  # flat view, entry k * num_clauses + c
+        self.unsat = np.empty((walkers, formula.num_clauses), dtype=np.int32)
+        self.unsat_flat = self.unsat.ravel()
+        self.unsat_pos = np.empty(walkers * formula.num_clauses, dtype=np.int32)  # flat like counts
+        self.num_unsat = np.empty(walkers, dtype=np.intp)
+        self.mark = np.empty(walkers * formula.num_clauses, dtype=np.int32)  # scratch for unique()
+        self.restart()
+
+    def restart(self):
+        """New random assignments for every walker."""
+        formula = self.formula
+        self.value[:] = self.rng.integers(0, 2, self.value.shape, dtype=np.int8)
+        lit_true = (self.value[:, np.abs(formula.lits)] == (formula.lits > 0)).astype(np.int32)
+        self.true_count[:] = np.add.reduceat(lit_true, formula.offsets[:-1], axis=1)
+        self.unsat_pos[:] = -1
+        self.num_unsat[:] = 0
+        self.add_unsat(np.flatnonzero(self.counts == 0))
+
+    def add_unsat(self, flat):
+        """Appends the clauses (flat indices sorted by walker) to the unsatisfied lists."""
+        walker = flat // self.formula.num_clauses
+        per_walker = np.bincount(walker, minlength=self.walkers)
+        first = np.cumsum(per_walker) - per_walker
+        positions = self.num_unsat[walker] + np.arange(len(flat)) - first[walker]
+        self.unsat[walker, positions] = flat - walker * self.formula.num_clauses
+        self.unsat_pos[flat] = positions
+        self.num_unsat += per_walker
+
+    def remove_unsat(self, flat):
+        """Removes the clauses (flat indices sorted by walker) from the unsatisfied lists.
+           The holes below the new length of a list are filled with the clauses
+           that are kept from the end of the list, in walker order."""
+        num_clauses = self.formula.num_clauses
+        walker = flat // num_clauses
+        positions = self.unsat_pos[flat]
+        self.unsat_pos[flat] = -1
+        removed = np.bincount(walker, minlength=self.walkers)
+        self.num_unsat -= removed
+        holes = positions < self.num_unsat[walker]
+        tail_walker, tail = ranges(self.rows * num_clauses + self.num_unsat, removed)
+        moved = tail_walker * num_clauses + self.unsat_flat[tail]
+        moved = moved[self.unsat_pos[moved] >= 0]
+        hole_walker, hole_positions = walker[holes], positions[holes]
+        self.unsat[hole_walker, hole_positions] = moved - hole_walker * num_clauses
+        self.unsat_pos[moved] = hole_positions
+
+    def pick_clauses(self):
+        """A random unsatisfied clause of every walker.
+           Returns the clauses, or the number of a walker that has none."""
+        if not self.num_unsat.all():
+            return int(np.argmin(self.num_unsat)), None
+        pick = (self.rng.random(self.walkers) * self.num_unsat).astype(np.intp)
+        return None, self.unsat[self.rows, pick]
+
+    def choose_literals(self, clauses, noise):
+        """The literal to flip in the clause of each walker: one with the fewest
+           breaks (ties broken at random), or a random one with probability
+           noise when every literal breaks some clause."""
+        formula = self.formula
+        starts = formula.offsets[clauses]
+        lengths = formula.offsets[clauses + 1] - starts
+        lit_walker, lit_pos = ranges(starts, lengths)
+        keys = formula.neg_keys[lit_pos]
+        occ_starts = formula.occ_offsets[keys]
+        occ_lit, occ_pos = ranges(occ_starts, formula.occ_offsets[keys + 1] - occ_starts)
+        flat = lit_walker[occ_lit] * formula.num_clauses + formula.occ_clauses[occ_pos]
+        breaks = np.bincount(occ_lit, weights=self.counts[flat] == 1, minlength=len(lit_pos))
+        # the random fraction keeps the order of the scores and breaks the ties
+        scores = breaks + self.rng.random(len(breaks))
+        first = np.cumsum(lengths) - lengths
+        best = np.minimum.reduceat(scores, first)
+        choice = np.empty(self.walkers, dtype=np.intp)
+        is_best = np.flatnonzero(scores == np.repeat(best, lengths))
+        choice[lit_walker[is_best]] = is_best
+        noisy = (best >= 1) & (self.rng.random(self.walkers) < noise)
+        choice[noisy] = first[noisy] + (self.rng.random(int(noisy.sum())) * lengths[noisy]).astype(np.intp)
+        return formula.lits[lit_pos[choice]]
+
+    def flip(self, lits):
+        """Makes a false literal of every walker true and updates the counts
+           and the unsatisfied lists."""
+        formula = self.formula
+        self.value[self.rows, np.abs(lits)] ^= 1
+        touched = []
+        for keys, step in ((lits % formula.size, ONE), ((-lits) % formula.size, MINUS_ONE)):
+            starts = formula.occ_offsets[keys]
+            walker, positions = ranges(starts, formula.occ_offsets[keys + 1] - starts)
+            flat = walker * formula.num_clauses + formula.occ_clauses[positions]
+            np.add.at(self.counts, flat, step)
+            touched.append(flat)
+        # only the made clauses can leave the lists and only the broken ones can enter them
+        made, broken = touched
+        made = made[(self.unsat_pos[made] >= 0) & (self.counts[made] > 0)]
+        broken = broken[self.counts[broken] == 0]
+        self.remove_unsat(self.unique(made))
+        self.add_unsat(self.unique(broken))
+
+    def unique(self, flat):
+        """The flat indices without repetitions (a clause with a repeated literal
+           is touched more than once), keeping their order."""
+        order = np.arange(len(flat))
+        self.mark[flat] = order
+        return flat[self.mark[flat] == order]
+
+    def model(self, walker):
+        """The assignment of a walker as a list of literals."""
+        value = self.value[walker]
+        return [var if value[var] else -var for var in range(1, self.formula.num_vars + 1)]
+
+
+def batch_walksat(formula, walkers=WALKERS, noise=NOISE, flips_proportion=FLIPS_PROPORTION):
+    """Runs batches of WalkSAT walkers until one finds a model, returns it as a
+       list of literals. Returns None if the formula has an empty clause."""
+    if np.any(np.diff(formula.offsets) == 0):
+        return None
+    if not formula.num_clauses:
+        return [-var for var in range(1, formula.num_vars + 1)]
+    walkers = min(walkers, max(1, MAX_CELLS // len(formula.lits)))
+    batch = Batch(formula, np.random.default_rng(random.getrandbits(64)), walkers)
+    max_flips = max(1, flips_proportion * formula.num_vars)
+    # seconds between progress lines given by the race (0 = no progress lines)
+    progress = float(os.environ.get("SAT_PROGRESS", 0))
+    start = last_progress = time.process_time()
+    steps = 0
+    while 1:
+        done, clauses = batch.pick_clauses()
+        if done is not None:
+            if progress:
+                print_progress(steps * walkers, 0, time.process_time() - start)
+            return batch.model(done)
+        steps += 1
+        if progress and time.process_time() - last_progress >= progress:
+            last_progress = time.process_time()
+            unsat = int(batch.num_unsat.min())
+            print_progress(steps * walkers, unsat, last_progress - start)
+        batch.flip(batch.choose_literals(clauses, noise))
+        if steps % max_flips == 0:
+            batch.restart()
+
+
+def main():
+    """parses arguments, runs the batched NumPy WalkSAT and prints the solution"""
+    if len(sys.argv) != 2:
+        sys.stderr.write("ERROR: Incorrect number of arguments. Given %s. Expected 2.\n" %
+                         len(sys.argv))
+        sys.exit("Use: %s CNF_file" % sys.argv[0])
+    cnf_path = sys.argv[1]
+    if not os.path.isfile(cnf_path):
+        sys.exit("ERROR: CNF file %s does not exist." % cnf_path)
+
+    random.seed(os.environ.get("SAT_SEED"))  # seed given by the race, if any
+    print_solution(batch_walksat(load_formula(cnf_path)))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,199 @@
+#!/usr/bin/python3
+# -*- coding: utf-8 -*-
+
+"""
+    ------------------------- NumPy WalkSAT -------------------------
+
+    WalkSAT with the formula and the search state in NumPy arrays, for
+    instances with long occurrence lists where the Python loops of the
+    other walkers dominate.
+
+    The formula is kept in CSR form (int32 arrays of dimacs.py):
+        lits[offsets[c]:offsets[c + 1]]: literals of clause c
+        occ_clauses[occ_offsets[k]:occ_offsets[k + 1]]: clauses of the
+            literal with key k = lit % (2 * num_vars + 1)
+    The break scores of all the literals of the chosen clause come from one
+    gather over their occurrence ranges, and a flip updates the true literal
+    counts of the clauses with np.add.at (a clause with a repeated literal
+    appears twice in its occurrence range).
+
+"""
+import sys
+import os
+import random
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir))
+import dimacs  # shared DIMACS reader
+
+NOISE = 0.4  # probability of a random walk step when every literal breaks some clause
+FLIPS_PROPORTION = 10  # flips of a try, times the number of variables
+# increments of np.add.at with the dtype of the counts, a Python int makes it take its slow generic path
+ONE = np.int32(1)
+MINUS_ONE = np.int32(-1)
+
+
+class Formula:
+    """CSR arrays of a formula and its occurrence index.
+       The arrays used as indexes are widened to intp, NumPy gathers with them without a conversion."""
+
+    def __init__(self, cnf):
+        self.num_vars = cnf.num_vars
+        self.num_clauses = cnf.num_clauses
+        self.size = 2 * cnf.num_vars + 1
+        self.lits = np.frombuffer(cnf.lits, dtype=np.int32)
+        self.offsets = np.frombuffer(cnf.offsets, dtype=np.int32)
+        occ_offsets, occ_clauses = dimacs.occurrences(cnf)
+        self.occ_offsets = np.frombuffer(occ_offsets, dtype=np.int32).astype(np.intp)
+        self.occ_clauses = np.frombuffer(occ_clauses, dtype=np.int32).astype(np.intp)
+        # key of the negation of each literal, its occurrences are the clauses a flip may break
+        self.neg_keys = ((-self.lits) % self.size).astype(np.intp)
+        self.clause_of = np.repeat(np.arange(self.num_clauses, dtype=np.int32), np.diff(self.offsets))
+
+    def occurrences(self, lit):
+        """Clauses of a literal."""
+        k = lit % self.size
+        return self.occ_clauses[self.occ_offsets[k]:self.occ_offsets[k + 1]]
+
+
+def load_formula(cnf_path):
+    """Reads a cnf file into a Formula."""
+    return Formula(dimacs.load(cnf_path))
+
+
+def print_progress(flips, unsat, elapsed):
+    """Prints a progress line: flips done, unsatisfied clauses and CPU seconds."""
+    sys.stdout.write("c o %d %d %.3f\n" % (flips, unsat, elapsed))
+    sys.stdout.flush()
+
+
+class Walker:
+    """Search state of one assignment.
+       value: 1 if the variable is true, by variable (position 0 unused)
+       true_count: true literals of each clause
+       unsat, unsat_pos: unsatisfied clauses and the position of each one in
+                         the list (-1 if satisfied), for O(1) picks and removals
+    """
+
+    def __init__(self, formula, rng):
+        self.formula = formula
+        self.value = rng.integers(0, 2, formula.num_vars + 1, dtype=np.int8)
+        lit_true = self.value[np.abs(formula.lits)] == (formula.lits > 0)
+        self.true_count = np.bincount(formula.clause_of, weights=lit_true,
+                                      minlength=formula.num_clauses).astype(np.int32)
+        self.unsat = np.flatnonzero(self.true_count == 0).tolist()
+        self.unsat_pos = [-1] * formula.num_clauses
+        for pos, idx in enumerate(self.unsat):
+            self.unsat_pos[idx] = pos
+
+    def add_unsat(self, idx):
+        self.unsat_pos[idx] = len(self.unsat)
+        self.unsat.append(idx)
+
+    def remove_unsat(self, idx):
+        pos = self.unsat_pos[idx]
+        last = self.unsat.pop()
+        if last != idx:  # the last clause takes the place of the removed one
+            self.unsat[pos] = last
+            self.unsat_pos[last] = pos
+        self.unsat_pos[idx] = -1
+
+    def break_scores(self, clause):
+        """Clauses each literal of an unsatisfied clause would break: the clauses
+           of its negation where that negation is the only true literal."""
+        formula = self.formula
+        start, end = formula.offsets[clause], formula.offsets[clause + 1]
+        keys = formula.neg_keys[start:end]
+        starts = formula.occ_offsets[keys]
+        lengths = formula.occ_offsets[keys + 1] - starts
+        total = int(lengths.sum())
+        if not total:
+            return np.zeros(len(keys), dtype=np.int64)
+        segment = np.repeat(np.arange(len(keys)), lengths)
+        # position in occ_clauses of each gathered occurrence
+        first = np.cumsum(lengths) - lengths
+        positions = np.arange(total) - np.repeat(first - starts, lengths)
+        critical = self.true_count[formula.occ_clauses[positions]] == 1
+        return np.bincount(segment, weights=critical, minlength=len(keys))
+
+    def flip(self, lit):
+        """Makes a false literal true and updates the counts and the unsatisfied clauses."""
+        formula = self.formula
+        self.value[abs(lit)] ^= 1
+        made = formula.occurrences(lit)
+        broken = formula.occurrences(-lit)
+        np.add.at(self.true_count, made, ONE)
+        np.add.at(self.true_count, broken, MINUS_ONE)
+        # a clause with a repeated literal goes from 0 to 2 true literals, and appears twice in made
+        for idx in made[self.true_count[made] > 0].tolist():
+            if self.unsat_pos[idx] >= 0:
+                self.remove_unsat(idx)
+        for idx in broken[self.true_count[broken] == 0].tolist():
+            if self.unsat_pos[idx] < 0:
+                self.add_unsat(idx)
+
+    def model(self):
+        """The assignment as a list of literals."""
+        return [var if self.value[var] else -var for var in range(1, self.formula.num_vars + 1)]
+
+
+def walksat(formula, noise=NOISE, flips_proportion=FLIPS_PROPORTION):
+    """Runs WalkSAT tries until a model is found, returns it as a list of literals.
+       Returns None if the formula has an empty clause."""
+    if formula.num_clauses and np.any(np.diff(formula.offsets) == 0):
+        return None
+    rng = np.random.default_rng(random.getrandbits(64))
+    max_flips = max(1, flips_proportion * formula.num_vars)
+    # seconds between progress lines given by the race (0 = no progress lines)
+    progress = float(os.environ.get("SAT_PROGRESS", 0))
+    start = last_progress = time.process_time()
+    flips = 0
+    while 1:
+        walker = Walker(formula, rng)
+        for _ in range(max_flips):
+            if not walker.unsat:
+                if progress:
+                    print_progress(flips, 0, time.process_time() - start)
+                return walker.model()
+            flips += 1
+            if progress and flips % 1000 == 0 and time.process_time() - last_progress >= progress:
+                last_progress = time.process_time()
+                print_progress(flips, len(walker.unsat), last_progress - start)
+            clause = random.choice(walker.unsat)
+            scores = walker.break_scores(clause)
+            best = scores.min()
+            if best > 0 and random.random() < noise:
+                choice = random.randrange(len(scores))
+            else:
+                choice = random.choice(np.flatnonzero(scores == best).tolist())
+            walker.flip(int(formula.lits[formula.offsets[clause] + choice]))
+
+
+def print_solution(solution):
+    """Prints the model found."""
+    sys.stdout.write("c %s\n" % sys.argv[0][:-3])
+    if solution is not None:
+        sys.stdout.write("s SATISFIABLE\n")
+        sys.stdout.write("v %s 0\n" % " ".join(str(lit) for lit in solution))
+    else:
+        sys.stdout.write("s SOLUTION NOT FOUND\n")
+
+
+def main():
+    """parses arguments, runs the NumPy WalkSAT and prints the solution"""
+    if len(sys.argv) != 2:
+        sys.stderr.write("ERROR: Incorrect number of arguments. Given %s. Expected 2.\n" %
+                         len(sys.argv))
+        sys.exit("Use: %s CNF_file" % sys.argv[0])
+    cnf_path = sys.argv[1]
+    if not os.path.isfile(cnf_path):
+        sys.exit("ERROR: CNF file %s does not exist." % cnf_path)
+
+    random.seed(os.environ.get("SAT_SEED"))  # seed given by the race, if any
+    print_solution(walksat(load_formula(cnf_path)))
+
+
+if __name__ == "__main__":
+    main()
@@ -14,25 +14,25 @@
 import sys
 import os
 import random
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir))
+import dimacs  # shared DIMACS reader
+import preprocess  # simplification before the search
+
+# probSAT selection: (cb, eps) by default for each break function
+#   poly: (eps + break) ** -cb
+#   exp:  cb ** -break
+PROBSAT_DEFAULTS = {"poly": (2.38, 1.0), "exp": (2.5, 0.0)}
 
 
 def get_cnf(cnf_path):
     """Given the path of the cnf, returns the clauses, the number of variables
         and the number of clauses.
     """
-    with open(cnf_path) as fcnf:
-        name = fcnf.readline().strip()
-        conf_line = fcnf.readline().strip().split()
-        num_vars = int(conf_line[2])
-        num_clauses = int(conf_line[3])
-        clauses = []
-        clause_line = fcnf.readline().strip().split()
-        while clause_line:
-            clause_line = sorted(
-                clause_line[:-1], key=lambda clause: int(clause.lstrip("-")))  # sort clause by variable
-            clauses.append([int(cl) for cl in clause_line])
-            clause_line = fcnf.readline().strip().split()
-    return clauses, num_vars, num_clauses
+    cnf = dimacs.load(cnf_path)
+    clauses = [sorted(clause, key=abs) for clause in dimacs.clause_lists(cnf)]  # sort clause by variable
+    return clauses, cnf.num_vars, cnf.num_clauses
 
 
 def print_solution(solution):
@@ -74,36 +74,46 @@ def get_unsat_clauses_idx(clauses_sat_lit):
     return unsat_clauses_idx
 
 
-def get_clauses_sat_lit(clauses, interpretation, num_clauses):
-    """Get the satisfied literals for each clause and the indexes of the unsatisfied clauses."""
-    clauses_sat_list = [0 for _ in range(num_clauses)]
+def get_clauses_sat_lit(clauses, interpretation, num_clauses, num_vars):
+    """Get the search state of an interpretation, for clauses without repeated variables:
+          the satisfied literals for each clause
+          the xor of the variables of its satisfied literals, the only one when there is one
+          the break score of each variable: clauses where it is the only satisfied literal
+          the indexes of the unsatisfied clauses and the position of each clause in that list
+    """
+    clauses_sat_list = [0] * num_clauses
+    true_vars = [0] * num_clauses
+    break_count = [0] * (num_vars + 1)
     unsat_clauses = []
+    unsat_pos = [-1] * num_clauses
     for idx, clause in enumerate(clauses):
         sat_counter = 0
+        xor = 0
         for lit in clause:
             if lit == interpretation[abs(lit) - 1]:
                 sat_counter += 1
+                xor ^= abs(lit)
         clauses_sat_list[idx] = sat_counter
+        true_vars[idx] = xor
         if sat_counter == 0:  # is current clause unsatisfied by the interpretation?
+            unsat_pos[idx] = len(unsat_clauses)
             unsat_clauses.append(idx)
-    return clauses_sat_list, unsat_clauses
+        elif sat_counter == 1:
+            break_count[xor] += 1
+    return clauses_sat_list, true_vars, break_count, unsat_clauses, unsat_pos
 
 
 def get_random_unsat_clause_idx(unsat_clauses_idx):
     """Pick randomly an index of an unsatisfied clause."""
-    return unsat_clauses_idx[random.randint(0, len(unsat_clauses_idx) - 1)]
+    return unsat_clauses_idx[int(random.random() * len(unsat_clauses_idx))]
 
 
-def get_min_break(unsat_clause, lit_to_clauses, clauses_sat_lit, num_clauses):
+def get_min_break(unsat_clause, break_count, num_clauses):
     """Gets the variables that minimizes the break score."""
     min_break = num_clauses
     min_break_literals = []
     for literal in unsat_clause:
-        current_break = 0
-        for clause_idx in lit_to_clauses[-literal]:  # satisfied clauses
-            # if current literal flips, this clause will go unsat
-            if clauses_sat_lit[clause_idx] == 1:
-                current_break += 1
+        current_break = break_count[abs(literal)]
         if current_break < min_break:
             min_break = current_break
             min_break_literals = [literal]
@@ -112,55 +122,181 @@ def get_min_break(unsat_clause, lit_to_clauses, clauses_sat_lit, num_clauses):
     return min_break_literals, min_break
 
 
+def get_probsat_table(function, cb, eps, max_break):
+    """Gets the probSAT weight of each break score from 0 to max_break."""
+    if function == "poly":
+        return [(eps + score) ** -cb for score in range(max_break + 1)]
+    return [cb ** -score for score in range(max_break + 1)]
+
+
+def get_probsat_literal(unsat_clause, break_count, table, weights):
+    """Picks a literal of the clause with probability proportional to the weight of its break score.
+       weights is a preallocated list at least as long as the clause, for the cumulative weights."""
+    total = 0.0
+    for pos, literal in enumerate(unsat_clause):
+        total += table[break_count[abs(literal)]]
+        weights[pos] = total
+    threshold = random.random() * total
+    last = len(unsat_clause) - 1
+    pos = 0
+    while pos < last and weights[pos] <= threshold:
+        pos += 1
+    return unsat_clause[pos]
+
+
+def get_probsat_config():
+    """Gets the probSAT settings from the environment: REALLYSAT_PROBSAT (poly or exp,
+       unset for the WalkSAT selection), REALLYSAT_CB and REALLYSAT_EPS.
+       Returns (function, cb, eps), or None for the WalkSAT selection."""
+    function = os.environ.get("REALLYSAT_PROBSAT")
+    if not function:
+        return None
+    if function not in PROBSAT_DEFAULTS:
+        sys.exit("ERROR: REALLYSAT_PROBSAT must be one of %s." % ", ".join(sorted(PROBSAT_DEFAULTS)))
+    cb, eps = PROBSAT_DEFAULTS[function]
+    try:
+        cb = float(os.environ.get("REALLYSAT_CB", cb))
+        eps = float(os.environ.get("REALLYSAT_EPS", eps))
+    except ValueError:
+        sys.exit("ERROR: REALLYSAT_CB and REALLYSAT_EPS must be numbers.")
+    # the weights (eps + breaks) ** -cb of poly and cb ** -breaks of exp must be finite and positive
+    if not cb > 0:
+        sys.exit("ERROR: REALLYSAT_CB must be greater than 0 (given %s)." % cb)
+    if function == "poly" and not eps > 0:
+        sys.exit("ERROR: REALLYSAT_EPS must be greater than 0 with poly (given %s)." % eps)
+    return (function, cb, eps)
+
+
 def flip_var(interpretation, var):
     """Given an interpretation and a variable, flips the variable value in the interpretation."""
     interpretation[abs(var) - 1] *= -1
 
 
-def update_sat_literals(fvar, lit_to_clauses, clauses_sat_lit, unsat_clauses_idx):
-    """updates the number of satisfied literals each clause has.
+def update_sat_literals(fvar, lit_to_clauses, clauses_sat_lit, true_vars, break_count,
+                        unsat_clauses_idx, unsat_pos):
+    """updates the number of satisfied literals each clause has and the break scores
+       of the variables whose clauses go between 0, 1 and 2 satisfied literals.
        it also updates the list of indexes of unsatisfied clauses."""
+    var = abs(fvar)
     for old_idx in lit_to_clauses[-fvar]:
-        clauses_sat_lit[old_idx] -= 1
-        if clauses_sat_lit[old_idx] == 0:
+        count = clauses_sat_lit[old_idx] - 1
+        clauses_sat_lit[old_idx] = count
+        true_vars[old_idx] ^= var
+        if count == 0:
+            break_count[var] -= 1
+            unsat_pos[old_idx] = len(unsat_clauses_idx)
             unsat_clauses_idx.append(old_idx)
+        elif count == 1:  # the literal left becomes critical
+            break_count[true_vars[old_idx]] += 1
 
     for new_idx in lit_to_clauses[fvar]:
-        clauses_sat_lit[new_idx] += 1
-        if clauses_sat_lit[new_idx] == 1:
-            unsat_clauses_idx.remove(new_idx)
-
-
-def run_reallysat(clauses, num_vars, num_clauses):
-    """runs reallySAT solver with given clauses, number of variables and number of clauses"""
+        count = clauses_sat_lit[new_idx] + 1
+        clauses_sat_lit[new_idx] = count
+        true_vars[new_idx] ^= var
+        if count == 1:
+            break_count[var] += 1
+            # swap-remove: the last unsatisfied clause takes its place
+            pos = unsat_pos[new_idx]
+            last = unsat_clauses_idx.pop()
+            if last != new_idx:
+                unsat_clauses_idx[pos] = last
+                unsat_pos[last] = pos
+            unsat_pos[new_idx] = -1
+        elif count == 2:  # the literal that was critical is no longer
+            break_count[true_vars[new_idx] ^ var] -= 1
+
+
+def print_progress(flips, unsat, elapsed):
+    """Prints a progress line: flips done, unsatisfied clauses and CPU seconds."""
+    sys.stdout.write("c o %d %d %.3f\n" % (flips, unsat, elapsed))
+    sys.stdout.flush()
+
+
+def fix_literals(lits, fixed, interpretation, lit_to_clauses, state):
+    """makes the given literals true and adds their variables to the fixed ones, which are never flipped.
+       state: the lists of the search state, as returned by get_clauses_sat_lit"""
+    for lit in lits:
+        fixed.add(abs(lit))
+        if interpretation[abs(lit) - 1] != lit:
+            update_sat_literals(lit, lit_to_clauses, *state)
+            flip_var(interpretation, lit)
+
+
+def run_reallysat(clauses, num_vars, num_clauses, exchange=None):
+    """runs reallySAT solver with given clauses, number of variables and number of clauses.
+       exchange(interpretation, unsat) is called every 1000 flips for solvers
+       running alongside: it returns the literals found to be implied by the formula since the last call,
+       these are fixed for the rest of the search.
+       The literal to flip is the WalkSAT one (minimum break, or a random one with probability prob),
+       or the probSAT one when get_probsat_config gives its settings."""
     max_flips = int(1/4 * num_vars ** 2)
     lit_to_clauses = get_lit_to_clauses(clauses, num_vars)
     prob = 0.45
+    probsat = get_probsat_config()
+    if probsat:
+        # a break score is at most the occurrences of a literal
+        table = get_probsat_table(*probsat, max(len(occurrences) for occurrences in lit_to_clauses))
+        weights = [0.0] * max((len(clause) for clause in clauses), default=0)
+    # seconds between progress lines (0 = no progress lines)
+    progress = float(os.environ.get("SAT_PROGRESS", 0))
+    start = last_progress = time.process_time()
+    flips = 0
+    fixed = set()  # variables that must keep their value
+    fixed_lits = []
     while 1:
         interpretation = get_random_interpretation(num_vars)
-        clauses_sat_lit, unsat_clauses_idxs = get_clauses_sat_lit(
-            clauses, interpretation, num_clauses)
+        state = get_clauses_sat_lit(clauses, interpretation, num_clauses, num_vars)
+        clauses_sat_lit, true_vars, break_count, unsat_clauses_idxs, unsat_pos = state
+        fix_literals(fixed_lits, fixed, interpretation, lit_to_clauses, state)
         for _ in range(max_flips):
             if not unsat_clauses_idxs:
+                if progress:
+                    print_progress(flips, 0, time.process_time() - start)
                 return interpretation
+            flips += 1
+            if progress and flips % 1000 == 0 and time.process_time() - last_progress >= progress:
+                last_progress = time.process_time()
+                print_progress(flips, len(unsat_clauses_idxs), last_progress - start)
+            if exchange and flips % 1000 == 0:
+                new_lits = exchange(interpretation, len(unsat_clauses_idxs))
+                fixed_lits.extend(new_lits)
+                fix_literals(new_lits, fixed, interpretation, lit_to_clauses, state)
+                if not unsat_clauses_idxs:
+                    continue
             cidx = get_random_unsat_clause_idx(unsat_clauses_idxs)
             unsat_clause = clauses[cidx]
-            bvars, break_score = get_min_break(
-                unsat_clause,
-                lit_to_clauses,
-                clauses_sat_lit,
-                num_clauses)
-            if break_score > 0 and random.random() < prob:
-                fvar = random.choice(unsat_clause)
+            if fixed:  # the fixed literals of an unsatisfied clause are false
+                unsat_clause = [lit for lit in unsat_clause if abs(lit) not in fixed]
+                if not unsat_clause:  # only if the formula is unsatisfiable
+                    continue
+            if probsat:
+                fvar = get_probsat_literal(unsat_clause, break_count, table, weights)
             else:
-                fvar = bvars[-1]  # picks the only var in b_vars
-
-            update_sat_literals(fvar, lit_to_clauses,
-                                clauses_sat_lit, unsat_clauses_idxs)
+                bvars, break_score = get_min_break(
+                    unsat_clause,
+                    break_count,
+                    num_clauses)
+                if break_score > 0 and random.random() < prob:
+                    fvar = random.choice(unsat_clause)
+                else:
+                    fvar = bvars[-1]  # picks the only var in b_vars
+
+            update_sat_literals(fvar, lit_to_clauses, clauses_sat_lit, true_vars,
+                                break_count, unsat_clauses_idxs, unsat_pos)
 
             flip_var(interpretation, fvar)
 
 
+def solve(clauses, num_vars, num_clauses, exchange=None):
+    """simplifies the formula, runs reallySAT on the clauses left and extends the model to all the variables.
+       Returns None if the simplification finds the formula unsatisfiable."""
+    reduced = preprocess.simplify(clauses, num_vars)
+    if reduced.unsat:
+        return None
+    interpretation = run_reallysat(reduced.clauses, num_vars, len(reduced.clauses), exchange)
+    return preprocess.extend(reduced, interpretation)
+
+
 def main():
     """parses arguments, runs reallySAT solver and prints the solution"""
     if len(sys.argv) != 2:
@@ -171,8 +307,9 @@ def main():
     if not os.path.isfile(cnf_path):
         sys.exit("ERROR: CNF file %s does not exist." % cnf_path)
 
+    random.seed(os.environ.get("SAT_SEED"))  # seed given by the race, if any
     clauses, num_vars, num_clauses = get_cnf(cnf_path)
-    solution = run_reallysat(clauses, num_vars, num_clauses)
+    solution = solve(clauses, num_vars, num_clauses)
     print_solution(solution)
 
 
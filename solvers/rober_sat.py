@@ -10,6 +10,10 @@
 from random import *
 import numpy as np
 import sys
+import os
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir))
+import dimacs  # Shared DIMACS reader
 
 
 # Classes
@@ -17,16 +21,8 @@ import sys
 # First of all, we read the input file in this function and we take the data that we need.
 
 def read_file(filename):
-    clauses_list = []
-    for line in open(filename):
-        if line.startswith('c'):  # Comment line
-            continue
-        if line.startswith('p'):  # Data => clauses and variables
-            vars = line.split()[2]
-            continue
-        clause = [int(x) for x in line[:-2].split()]  # Constructing a clause
-        clauses_list.append(clause)
-    return clauses_list, int(vars)
+    cnf = dimacs.load(filename)
+    return dimacs.clause_lists(cnf), cnf.num_vars
 
 
 # We generate a random solution to use in the solver
@@ -131,5 +127,6 @@ def pivot(clause, sat_literals, lit_in_clause, solution):
 # Main
 
 if __name__ == '__main__':
+    seed(os.environ.get('SAT_SEED'))  # Seed given by the race, if any
     clauses, vars = read_file(sys.argv[1])
     walk_sat(clauses, vars)
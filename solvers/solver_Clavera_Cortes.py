@@ -3,6 +3,7 @@
 Autor1: Alejandro Clavera Poza
 Autor2: Ivan Cortes Garrido 
 '''
+import os
 import random
 import copy
 import argparse
@@ -68,7 +69,8 @@ class Codification:
         # The next value contain num_variables - 1 bits with value 1
         max_number = (2 ** (num_variables)) - 1
         # Generate random number for codification
-        random.seed(seed)
+        if seed is not None:
+            random.seed(seed)
         value = random.randint(1, max_number)
         random_codification.true_part = value
         random_codification.max_true_part = num_variables
@@ -113,6 +115,125 @@ class Interpretation:
     def copy(self):
         return copy.deepcopy(self)
 
+class BitSlicedFormula:
+    '''
+    ## Bit-sliced Formula Class
+    Evaluates a formula over `width` interpretations at once. The
+    interpretations are stored transposed: bit w of masks[variable] is the
+    value of the variable in interpretation w, so the interpretations that
+    falsify a clause are the bits left clear after OR-ing the masks of its
+    literals. The number of falsified clauses of each interpretation is kept
+    in a bit-sliced counter: planes[i] holds bit i of every count.
+    '''
+
+    def __init__(self, clauses, n_variables, width=64):
+        self.clauses = [clause.get_variables() for clause in clauses]
+        self.n_variables = n_variables
+        self.width = width
+        self.full = (1 << width) - 1
+        # Clauses of each literal
+        self.occurrences = {}
+        for index, clause in enumerate(self.clauses):
+            for literal in clause:
+                self.occurrences.setdefault(literal, []).append(index)
+        self.masks = [0] * (n_variables + 1)
+        self.falsified = [0] * len(self.clauses)
+        self.planes = [0] * len(self.clauses).bit_length()
+        self.unsat = []
+        self.unsat_position = {}
+
+    def randomize(self):
+        # New random interpretations, and their falsified clauses
+        self.masks = [random.getrandbits(self.width) for _ in range(self.n_variables + 1)]
+        self.planes = [0] * len(self.planes)
+        self.unsat = []
+        self.unsat_position = {}
+        for index, clause in enumerate(self.clauses):
+            self.falsified[index] = 0
+            self.set_falsified(index, self.evaluate(clause))
+
+    def literal_mask(self, literal):
+        # Interpretations where the literal is true
+        if literal > 0:
+            return self.masks[literal]
+        return self.full ^ self.masks[-literal]
+
+    def evaluate(self, clause):
+        # Interpretations that falsify the clause
+        satisfied = 0
+        for literal in clause:
+            satisfied |= self.literal_mask(literal)
+        return self.full ^ satisfied
+
+    def set_falsified(self, index, falsified):
+        # Update the counter and the unsatisfied clauses with the new mask of a clause
+        old = self.falsified[index]
+        if falsified == old:
+            return
+        self.increment(falsified & ~old)
+        self.decrement(old & ~falsified)
+        self.falsified[index] = falsified
+        if not old:
+            self.unsat_position[index] = len(self.unsat)
+            self.unsat.append(index)
+        elif not falsified:
+            # Swap-remove from the unsatisfied clauses
+            position = self.unsat_position.pop(index)
+            last = self.unsat.pop()
+            if last != index:
+                self.unsat[position] = last
+                self.unsat_position[last] = position
+
+    def increment(self, mask):
+        # Add one to the count of the interpretations in the mask
+        for i in range(len(self.planes)):
+            if not mask:
+                break
+            plane = self.planes[i]
+            self.planes[i] = plane ^ mask
+            mask &= plane
+
+    def decrement(self, mask):
+        # Subtract one from the count of the interpretations in the mask
+        for i in range(len(self.planes)):
+            if not mask:
+                break
+            plane = self.planes[i]
+            self.planes[i] = plane ^ mask
+            mask &= ~plane
+
+    def models(self):
+        # Interpretations with no falsified clause
+        nonzero = 0
+        for plane in self.planes:
+            nonzero |= plane
+        return self.full ^ nonzero
+
+    def breaks(self, literal, flipping):
+        # Clauses broken by making the literal true in the interpretations
+        # of flipping, where it is false: the clauses of its negation whose
+        # other literals are all false there
+        broken = 0
+        for index in self.occurrences.get(-literal, ()):
+            satisfied = 0
+            for other in self.clauses[index]:
+                if other != -literal:
+                    satisfied |= self.literal_mask(other)
+            broken += (flipping & ~satisfied).bit_count()
+        return broken
+
+    def flip(self, variable, flipping):
+        # Flip a variable in the interpretations of flipping
+        self.masks[variable] ^= flipping
+        for literal in (variable, -variable):
+            for index in self.occurrences.get(literal, ()):
+                self.set_falsified(index, self.evaluate(self.clauses[index]))
+
+    def interpretation(self, w):
+        # Interpretation number w
+        return Interpretation([variable if (self.masks[variable] >> w) & 1 else -variable
+                               for variable in range(1, self.n_variables + 1)])
+
 def load_file(path):
     info = {
         'n_variables': 0,
@@ -205,6 +326,32 @@ def walksat_solver(formula, max_tries=1000, max_flips=100, probability=0.5):
                 interpretation.flip(abs(min_broken_variable))        
     print("Not found result")
 
+def bitsliced_walksat(formula, width=8, max_tries=1000, max_flips=40000, probability=0.5):
+    # Walksat over `width` interpretations at once: a random falsified clause
+    # is fixed in every interpretation that falsifies it, by flipping the
+    # variable with the fewest breaks among them (or a random one)
+    sliced = BitSlicedFormula(formula['clauses'], formula['n_variables'], width)
+    if any(not clause for clause in sliced.clauses):
+        return None
+    for i in range(max_tries):
+        sliced.randomize()
+        for flip in range(max_flips):
+            models = sliced.models()
+            if models:
+                # Lowest interpretation without falsified clauses
+                return sliced.interpretation((models & -models).bit_length() - 1)
+            index = random.choice(sliced.unsat)
+            flipping = sliced.falsified[index]
+            clause = sliced.clauses[index]
+            breaks = [sliced.breaks(literal, flipping) for literal in clause]
+            if min(breaks) > 0 and random.random() < probability:
+                literal = random.choice(clause)
+            else:
+                literal = clause[breaks.index(min(breaks))]
+            sliced.flip(abs(literal), flipping)
+    print("Not found result")
+
+
 def check(formula, interpretation):
     error = False
     for cl in formula['clauses']:
@@ -217,8 +364,12 @@ def check(formula, interpretation):
         print('Satisfactible')
 
 def print_solution(interpretation):
-    interpretation = str(interpretation).replace(',', '').strip('[]')
     print('c {0}'.format(SOLVER_NAME))
+    if interpretation is None:
+        # Empty clause, or no model within the tries
+        print('s SOLUTION NOT FOUND')
+        return
+    interpretation = str(interpretation).replace(',', '').strip('[]')
     print('s SATISFIABLE')
     print('v ',end='')
     print(interpretation, end=' 0\n')
@@ -226,11 +377,18 @@ def print_solution(interpretation):
 if __name__ == '__main__':
     parser = argparse.ArgumentParser(description='SAT SOLVER')
     parser.add_argument('input_cnf_formula', type=str, help='cnf_formula path')
+    parser.add_argument('-w', '--width', type=int, default=8,
+                        help='interpretations searched at once by the bit-sliced walksat (0 for the plain walksat)')
     argparse = parser.parse_args()
+    # Seed given by the race, if any
+    random.seed(os.environ.get('SAT_SEED'))
     try:
         cnf = load_file(argparse.input_cnf_formula)
     except:
         print('Load file error')
         exit(-1)
-    interpretation = walksat_solver(cnf, max_tries=1000, max_flips=40000 ,probability=0.5)  
+    if argparse.width > 0:
+        interpretation = bitsliced_walksat(cnf, width=argparse.width, max_tries=1000, max_flips=40000, probability=0.5)
+    else:
+        interpretation = walksat_solver(cnf, max_tries=1000, max_flips=40000 ,probability=0.5)  
     print_solution(interpretation)
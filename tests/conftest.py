@@ -0,0 +1,28 @@
+import os
+import sys
+
+import pytest
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir)
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.join(ROOT, "solvers"))
+import dimacs
+
+
+@pytest.fixture(autouse=True)
+def cnfb_cache(tmp_path, monkeypatch):
+    """Compiled instances go to a temporary folder, not to the .cnfb folder of the repository."""
+    cache = str(tmp_path / "cnfb")
+    monkeypatch.setenv("CNFB_CACHE", cache)  # for the solvers run in other processes
+    monkeypatch.setattr(dimacs, "CACHE_FOLDER", cache)
+    return cache
+
+
+@pytest.fixture
+def write_cnf(tmp_path):
+    """Writes a CNF text to a file of tmp_path, returns its path."""
+    def write(name, text):
+        path = tmp_path / name
+        path.write_text(text)
+        return str(path)
+    return write
@@ -0,0 +1,36 @@
+import pytest
+
+import dimacs
+
+TOKENISERS = [dimacs._tokenise, dimacs._tokenise_numpy]
+
+
+@pytest.mark.parametrize("tokenise", TOKENISERS)
+def test_last_clause_without_zero_is_closed(tokenise):
+    lits, offsets = tokenise(b"1 -2 0\n3\n4")
+    assert lits.tolist() == [1, -2, 3, 4]
+    assert offsets.tolist() == [0, 2, 4]
+
+
+@pytest.mark.parametrize("tokenise", TOKENISERS)
+def test_clauses_ended_by_zero(tokenise):
+    lits, offsets = tokenise(b"1 -2 0\n3\n4 0\n")
+    assert offsets.tolist() == [0, 2, 4]
+    assert tokenise(b"")[1].tolist() == [0]
+
+
+@pytest.mark.parametrize("tokenise", TOKENISERS)
+def test_bad_token_raises(tokenise):
+    for data in (b"1 -2 0\n3 x 0\n", b"1 2.5 0\n"):
+        with pytest.raises(ValueError):
+            tokenise(data)
+
+
+def test_read_reports_the_file(tmp_path):
+    cnf = tmp_path / "bad.cnf"
+    cnf.write_text("p cnf 3 2\n1 -2 0\n3 y 0\n")
+    with pytest.raises(ValueError, match="bad.cnf"):
+        dimacs.read(str(cnf))
+    cnf.write_text("p cnf 3 2\n1 -2 0\n3 99999999999 0\n")
+    with pytest.raises(ValueError, match="out of range"):
+        dimacs.read(str(cnf))
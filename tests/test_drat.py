@@ -0,0 +1,12 @@
+import drat
+
+
+def test_rat_pivot_survives_propagation():
+    # 4 2 is RAT on 4 (no clause has -4) but not on 2, nor RUP
+    checker = drat.Checker([[-2, 5]], 5)
+    idx = checker.add([4, 2])
+    assert not checker.rup([4])  # the propagation through the lemma swaps its watched literals
+    assert checker.clauses[idx] == [2, 4]
+    checker.active[idx] = False  # as in the backward check
+    assert checker.verify(idx)
+
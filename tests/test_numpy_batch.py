@@ -0,0 +1,37 @@
+import numpy as np
+
+import numpy_batch
+import numpy_walksat
+
+
+def check_lists(batch):
+    for k in range(batch.walkers):
+        listed = batch.unsat[k, :batch.num_unsat[k]]
+        assert sorted(listed.tolist()) == np.flatnonzero(batch.true_count[k] == 0).tolist()
+        positions = batch.unsat_pos[k * batch.formula.num_clauses:(k + 1) * batch.formula.num_clauses]
+        assert (positions[listed] == np.arange(len(listed))).all()
+        assert (positions >= 0).sum() == len(listed)
+
+
+def test_unsat_lists_follow_the_flips(write_cnf):
+    rng = np.random.default_rng(3)
+    clauses = ["%i %i %i 0" % tuple(rng.choice([-1, 1], 3) * rng.choice(np.arange(1, 21), 3, replace=False)) for _ in range(90)]
+    clauses += ["1 1 2 0", "-3 -3 4 0"]  # repeated literals
+    formula = numpy_walksat.load_formula(write_cnf("f.cnf", "p cnf 20 %i\n%s\n" % (len(clauses), "\n".join(clauses))))
+    batch = numpy_batch.Batch(formula, rng, 8)
+    check_lists(batch)
+    for _ in range(200):
+        done, picked = batch.pick_clauses()
+        if done is not None:
+            batch.restart()
+        else:
+            batch.flip(batch.choose_literals(picked, 0.4))
+        check_lists(batch)
+
+
+def test_batch_walksat_finds_model(write_cnf):
+    cnf = write_cnf("repeated.cnf", "p cnf 3 3\n1 1 2 0\n-1 -1 3 0\n-3 -3 -2 0\n")
+    for seed in range(5):
+        numpy_batch.random.seed(seed)
+        model = set(numpy_batch.batch_walksat(numpy_walksat.load_formula(cnf), walkers=4))
+        assert all(any(lit in model for lit in clause) for clause in ([1, 2], [-1, 3], [-3, -2]))
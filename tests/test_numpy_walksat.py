@@ -0,0 +1,24 @@
+import numpy as np
+
+import numpy_walksat
+
+
+def test_flip_satisfies_clause_with_repeated_literal(write_cnf):
+    formula = numpy_walksat.load_formula(write_cnf("repeated.cnf", "p cnf 2 1\n1 1 2 0\n"))
+    rng = np.random.default_rng(0)
+    walker = numpy_walksat.Walker(formula, rng)
+    while walker.value[1] or walker.value[2]:  # start with the clause falsified
+        walker = numpy_walksat.Walker(formula, rng)
+    assert walker.unsat == [0]
+    walker.flip(1)
+    assert walker.true_count[0] == 2
+    assert walker.unsat == []
+    assert walker.unsat_pos[0] == -1
+
+
+def test_walksat_finds_model_with_repeated_literals(write_cnf):
+    cnf = write_cnf("repeated.cnf", "p cnf 3 3\n1 1 2 0\n-1 -1 3 0\n-3 -3 -2 0\n")
+    for seed in range(10):
+        numpy_walksat.random.seed(seed)
+        model = set(numpy_walksat.walksat(numpy_walksat.load_formula(cnf)))
+        assert all(any(lit in model for lit in clause) for clause in ([1, 2], [-1, 3], [-3, -2]))
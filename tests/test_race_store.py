@@ -0,0 +1,68 @@
+import race
+
+
+def make_solver(tmp_path):
+    """A solver in tmp/solvers that imports a module next to it and a shared module in tmp."""
+    (tmp_path / "solvers").mkdir()
+    (tmp_path / "solvers" / "helper.py").write_text("import shared\n")
+    (tmp_path / "shared.py").write_text("VALUE = 1\n")
+    solver = tmp_path / "solvers" / "solver.py"
+    solver.write_text("import sys\nfrom helper import *\nprint('s UNKNOWN')\n")
+    cnf = tmp_path / "f.cnf"
+    cnf.write_text("p cnf 1 1\n1 0\n")
+    return str(solver), str(cnf)
+
+
+def store_run(tmp_path, solver, cnf):
+    db = race.open_store(str(tmp_path / "store.db"))
+    out = tmp_path / "out.txt"
+    out.write_text("s UNKNOWN\n")
+    race.save_run(db, (str(tmp_path / "run0"), solver, cnf, 0), race.Run(str(out), 1.0, 0.0, 1.0, 10.0, False))
+    return db
+
+
+def test_local_imports(tmp_path):
+    solver, _ = make_solver(tmp_path)
+    assert race.local_imports(solver) == sorted([str(tmp_path / "shared.py"), str(tmp_path / "solvers" / "helper.py")])
+
+
+def test_store_hit(tmp_path):
+    solver, cnf = make_solver(tmp_path)
+    db = store_run(tmp_path, solver, cnf)
+    race.hashes.clear()
+    run = race.load_run(db, (str(tmp_path / "run1"), solver, cnf, 0))
+    assert run is not None and run.user == 1.0
+    with open(run.out_file) as f:
+        assert f.read() == "s UNKNOWN\n"
+
+
+def test_store_miss_on_changed_import(tmp_path):
+    solver, cnf = make_solver(tmp_path)
+    db = store_run(tmp_path, solver, cnf)
+    (tmp_path / "shared.py").write_text("VALUE = 2\n")
+    race.hashes.clear()
+    assert race.load_run(db, (str(tmp_path / "run1"), solver, cnf, 0)) is None
+    assert race.load_run(db, (str(tmp_path / "run1"), solver, cnf, 1)) is None
+
+
+def test_store_miss_on_changed_settings(tmp_path, monkeypatch):
+    solver, cnf = make_solver(tmp_path)
+    monkeypatch.delenv("REALLYSAT_PROBSAT", raising=False)
+    db = store_run(tmp_path, solver, cnf)
+    monkeypatch.setenv("REALLYSAT_PROBSAT", "poly")
+    assert race.load_run(db, (str(tmp_path / "run1"), solver, cnf, 0)) is None
+    db = store_run(tmp_path, solver, cnf)
+    assert race.load_run(db, (str(tmp_path / "run2"), solver, cnf, 0)) is not None
+    monkeypatch.setenv("REALLYSAT_PROBSAT", "bogus")
+    assert race.load_run(db, (str(tmp_path / "run3"), solver, cnf, 0)) is None
+
+
+def test_store_keeps_each_weighting(tmp_path, monkeypatch):
+    solver, cnf = make_solver(tmp_path)
+    monkeypatch.setenv("RACESATWINNER_WEIGHTING", "paws")
+    db = store_run(tmp_path, solver, cnf)
+    for weighting in ("saps", "none"):
+        monkeypatch.setenv("RACESATWINNER_WEIGHTING", weighting)
+        assert race.load_run(db, (str(tmp_path / ("run_" + weighting)), solver, cnf, 0)) is None
+    monkeypatch.setenv("RACESATWINNER_WEIGHTING", "paws")
+    assert race.load_run(db, (str(tmp_path / "run_paws"), solver, cnf, 0)) is not None
@@ -1,3 +0,0 @@
-#!/bin/bash
-ulimit -t 10
-python3 $1 $2